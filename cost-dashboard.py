@@ -1,10 +1,31 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 import requests
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+import csv
+import hashlib
+import heapq
+import html
+import json
+import os
+import re
+import tempfile
+import threading
 import time
+import uuid
+import zipfile
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is offered only when pyarrow is available
+    pa = pq = None
 
 # Page config
 st.set_page_config(
@@ -16,6 +37,10 @@ st.set_page_config(
 # Configuration
 #TRACKING_SERVER = "http://localhost:5000"  # Always use localhost for fixed server
 TRACKING_SERVER = "https://hustle-maestro-railway-production.up.railway.app/"
+# Comma-separated tracking deployments (per region/client); defaults to the single server above
+TRACKING_SERVERS = [s.strip() for s in os.environ.get("TRACKING_SERVERS", TRACKING_SERVER).split(",") if s.strip()]
+LEDGER_DIR = Path(os.environ.get("COST_LEDGER_DIR", ".cost_ledger"))
+EXPORT_DIR = Path(os.environ.get("REPORT_EXPORT_DIR", Path(tempfile.gettempdir()) / "cost-dashboard-exports"))
 # Custom CSS
 st.markdown("""
     <style>
@@ -63,27 +88,21 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data(ttl=30)
-def fetch_analytics():
-    """Fetch click analytics from tracking server."""
+def fetch_analytics(server, timeout=3):
+    """Fetch click analytics from one tracking server, reporting how the request went."""
+    started = time.perf_counter()
+    result = {"server": server, "analytics": None, "status": "error", "error": None}
     try:
-        response = requests.get(f"{TRACKING_SERVER}/api/analytics", timeout=3)
+        response = requests.get(f"{server.rstrip('/')}/api/analytics", timeout=timeout)
         if response.status_code == 200:
-            return response.json()
-        return None
+            result.update(analytics=response.json(), status="ok")
+        else:
+            result["error"] = f"HTTP {response.status_code}"
     except Exception as e:
-        return None
-
-@st.cache_data(ttl=10)
-def check_server_status():
-    """Check if tracking server is running."""
-    try:
-        response = requests.get(f"{TRACKING_SERVER}/health", timeout=2)
-        if response.status_code == 200:
-            return True
-        return False
-    except:
-        return False
+        result["error"] = str(e) or type(e).__name__
+    result["latency_ms"] = (time.perf_counter() - started) * 1000
+    result["fetched_at"] = time.time()
+    return result
 
 @st.cache_data(ttl=60)
 def fetch_public_url():
@@ -97,26 +116,1488 @@ def fetch_public_url():
     except:
         return None, None
 
+def clear_analytics_caches():
+    """Drop cached analytics responses without touching the rest of the app's caches."""
+    fetch_federated_analytics.clear()
+
+# ============= FEDERATED ANALYTICS =============
+class SourceHealth:
+    """Last known state of each tracking server, shared across sessions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sources = {}
+
+    def update(self, result):
+        with self._lock:
+            state = self._sources.setdefault(result["server"], {"last_ok": None, "failures": 0})
+            state.update(status=result["status"], latency_ms=result["latency_ms"], error=result["error"])
+            if result["status"] == "ok":
+                state["last_ok"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                state["failures"] = 0
+            else:
+                state["failures"] += 1
+
+    def rows(self, servers):
+        """Health table rows for the given servers, in order."""
+        with self._lock:
+            return [
+                {
+                    "Server": server,
+                    "Status": self._sources.get(server, {}).get("status", "unknown"),
+                    "Latency (ms)": round(self._sources.get(server, {}).get("latency_ms") or 0),
+                    "Last OK": self._sources.get(server, {}).get("last_ok") or "never",
+                    "Failures in a Row": self._sources.get(server, {}).get("failures", 0),
+                    "Error": self._sources.get(server, {}).get("error") or ""
+                }
+                for server in servers
+            ]
+
+@st.cache_resource
+def get_source_health():
+    """Health state per tracking server, kept for the life of the process."""
+    return SourceHealth()
+
+@st.cache_resource
+def get_fetch_pool():
+    """Worker threads for concurrent tracking-server requests."""
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix="tracking-fetch")
+
+@st.cache_data(ttl=30)
+def fetch_federated_analytics(servers, timeout=3):
+    """Fetch every tracking server concurrently.
+
+    Total wait is bounded by the per-source timeout: servers that have not answered
+    by then are reported as timed out and the rest are returned without them.
+    """
+    futures = {get_fetch_pool().submit(fetch_analytics, server, timeout): server for server in servers}
+    done, _ = wait(futures, timeout=timeout + 0.5)
+    results = []
+    for future, server in futures.items():
+        if future in done:
+            result = future.result()
+        else:
+            result = {"server": server, "analytics": None, "status": "timeout",
+                      "error": f"No response within {timeout}s", "latency_ms": timeout * 1000}
+        get_source_health().update(result)
+        results.append(result)
+    return results
+
+class HyperLogLog:
+    """Mergeable unique-count sketch (2**p one-byte registers, ~1.6% error at p=12)."""
+
+    def __init__(self, p=12, registers=None):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8) if registers is None else np.asarray(registers, dtype=np.uint8)
+
+    def add(self, value):
+        h = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
+
+def merge_analytics(sources, top_k=20, recent=50):
+    """Combine several /api/analytics payloads into one view.
+
+    Counts are summed. Top posts are merged by URL and re-ranked, which is exact for
+    posts that appear in every source's top list and a lower bound otherwise.
+    Unique users come from merged HyperLogLog sketches for sources that publish
+    'unique_users_hll' registers; other sources' unique counts are added as-is.
+    """
+    merged = {'total_clicks': 0, 'unique_users': 0, 'total_posts': 0,
+              'clicks_by_platform': {}, 'clicks_by_badge_type': {}}
+    posts, recent_clicks, sketch = {}, [], None
+    for analytics in sources:
+        merged['total_clicks'] += analytics.get('total_clicks', 0)
+        merged['total_posts'] += analytics.get('total_posts', 0)
+        for key in ('clicks_by_platform', 'clicks_by_badge_type'):
+            for name, clicks in (analytics.get(key) or {}).items():
+                merged[key][name] = merged[key].get(name, 0) + clicks
+        if analytics.get('unique_users_hll'):
+            source_sketch = HyperLogLog(registers=analytics['unique_users_hll'])
+            if sketch is None:
+                sketch = source_sketch
+            else:
+                sketch.merge(source_sketch)
+        else:
+            merged['unique_users'] += analytics.get('unique_users', 0)
+        for post in analytics.get('top_posts') or []:
+            existing = posts.get(post.get('post_url'))
+            if existing is None:
+                posts[post.get('post_url')] = dict(post)
+                continue
+            existing['clicks'] = existing.get('clicks', 0) + post.get('clicks', 0)
+            firsts = [t for t in (existing.get('first_click'), post.get('first_click')) if t]
+            lasts = [t for t in (existing.get('last_click'), post.get('last_click')) if t]
+            existing['first_click'] = min(firsts) if firsts else None
+            existing['last_click'] = max(lasts) if lasts else None
+        recent_clicks.extend(analytics.get('recent_clicks') or [])
+
+    if sketch is not None:
+        merged['unique_users'] += sketch.estimate()
+    merged['avg_clicks_per_post'] = round(merged['total_clicks'] / merged['total_posts'], 2) if merged['total_posts'] else 0
+    merged['top_posts'] = heapq.nlargest(top_k, posts.values(), key=lambda p: p.get('clicks', 0))
+    merged['recent_clicks'] = sorted(recent_clicks, key=lambda c: c.get('timestamp', ''))[-recent:]
+    return merged
+
+# ============= BACKGROUND JOBS =============
+class JobQueue:
+    """Runs background jobs (reset, screening, export) off the Streamlit script thread."""
+
+    def __init__(self, max_workers=2, max_history=50, thread_name_prefix="dashboard-job"):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_history = max_history
+
+    def submit(self, name, fn, *args, timeout=30, **kwargs):
+        """Queue fn(*args, **kwargs) and return a job id to poll with get()."""
+        job_id = uuid.uuid4().hex[:8]
+        job = {
+            "id": job_id,
+            "name": name,
+            "status": "queued",
+            "submitted": time.time(),
+            "started": None,
+            "finished": None,
+            "timeout": timeout,
+            "result": None,
+            "error": None
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self._max_history:
+                self._jobs.popitem(last=False)
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job, fn, args, kwargs):
+        with self._lock:
+            if job["status"] != "queued":
+                return
+            job.update(status="running", started=time.time())
+        try:
+            result, error, status = fn(*args, **kwargs), None, "done"
+        except Exception as e:
+            result, error, status = None, str(e), "failed"
+        with self._lock:
+            # A job that already blew its deadline stays reported as timed out
+            if job["status"] == "running":
+                job.update(status=status, result=result, error=error, finished=time.time())
+
+    def get(self, job_id):
+        """Return a snapshot of the job, marking it timed out once it has run past its deadline.
+
+        The deadline counts from when the job starts running, so time spent waiting
+        behind other jobs never times it out.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] == "running" and time.time() - job["started"] > job["timeout"]:
+                job.update(status="timed out", error=f"No result after {job['timeout']}s", finished=time.time())
+            return dict(job)
+
+@st.cache_resource
+def get_job_queue():
+    """One job queue per server process, shared by every session."""
+    return JobQueue()
+
+@st.cache_resource
+def get_screening_queue():
+    """One worker for long click-screening jobs, so they never hold up admin jobs."""
+    return JobQueue(max_workers=1, thread_name_prefix="click-screening")
+
+@st.cache_resource
+def get_export_queue():
+    """One worker for report exports, which can run for minutes on large click sets."""
+    return JobQueue(max_workers=1, thread_name_prefix="report-export")
+
+def reset_server(server, timeout):
+    """POST a reset to one tracking server; returns an error message or None."""
+    try:
+        response = requests.post(f"{server.rstrip('/')}/api/reset", timeout=timeout)
+    except requests.RequestException as e:
+        return f"{server}: {e}"
+    if response.status_code != 200:
+        return f"{server} answered {response.status_code}"
+    return None
+
+def reset_analytics_job(timeout, servers):
+    """Reset analytics on every tracking server concurrently, then invalidate only the analytics caches.
+
+    Like fetch_federated_analytics, the wait is bounded by the per-server timeout.
+    """
+    futures = {get_fetch_pool().submit(reset_server, server, timeout): server for server in servers}
+    done, _ = wait(futures, timeout=timeout + 0.5)
+    failures = [
+        future.result() if future in done else f"{server}: no response within {timeout}s"
+        for future, server in futures.items()
+    ]
+    failures = [failure for failure in failures if failure]
+    clear_analytics_caches()
+    if len(failures) < len(servers):
+        # Burst tallies describe clicks that no longer exist on the reset servers
+        get_live_detector.clear()
+    if failures:
+        raise RuntimeError("; ".join(failures))
+    return "Analytics reset" if len(servers) == 1 else f"Analytics reset on {len(servers)} servers"
+
+def show_job_result(job):
+    """Render the final state of a finished job."""
+    if job["status"] == "done":
+        st.success(f"✅ {job['result']}")
+    else:
+        st.error(f"❌ {job['name']} {job['status']}: {job['error']}")
+
+@st.fragment(run_every=1)
+def render_job_status(pending_key="pending_jobs", finished_key="finished_jobs", get_queue=get_job_queue):
+    """Poll this session's jobs once a second without rerunning the whole script."""
+    queue = get_queue()
+    jobs = [queue.get(job_id) for job_id in st.session_state.get(pending_key, [])]
+    jobs = [job for job in jobs if job is not None]
+    for job in jobs:
+        if job["status"] in ("queued", "running"):
+            st.info(f"⏳ {job['name']}: {job['status']} ({time.time() - job['submitted']:.0f}s)")
+        else:
+            show_job_result(job)
+    if all(job["status"] not in ("queued", "running") for job in jobs):
+        # Everything settled: hand results to the next full run, which also stops the polling
+        st.session_state[finished_key] = jobs
+        st.session_state[pending_key] = []
+        st.rerun()
+
+# ============= SYNTHETIC CLICK DATA =============
+PLATFORMS = ["facebook", "linkedin", "twitter", "instagram"]
+BADGE_TYPES = ["gold", "silver", "bronze"]
+PLATFORM_MIX = [0.39, 0.31, 0.22, 0.08]
+BADGE_MIX = [0.53, 0.31, 0.16]
+# Relative click volume per hour of day: quiet nights, morning ramp, lunch and evening peaks
+HOURLY_PROFILE = np.array([
+    0.6, 0.4, 0.3, 0.25, 0.3, 0.5, 1.0, 1.8, 2.6, 3.0, 2.9, 3.1,
+    3.4, 3.0, 2.7, 2.6, 2.8, 3.2, 3.6, 3.8, 3.3, 2.4, 1.6, 1.0
+])
+# Relative click volume Monday..Sunday
+WEEKDAY_PROFILE = np.array([1.1, 1.15, 1.15, 1.1, 1.0, 0.75, 0.7])
+
+def _skewed_choice(rng, n_items, size, exponent):
+    """Draw item indices with Zipf-like popularity (index 0 is the most popular).
+
+    Inverts the continuous power-law CDF directly, which avoids a binary search
+    over n_items per draw and keeps 10M draws well under a second.
+    """
+    u = rng.random(size)
+    if exponent == 1:
+        x = np.power(n_items + 1.0, u)
+    else:
+        a = 1.0 - exponent
+        x = np.power(1.0 + u * ((n_items + 1.0) ** a - 1.0), 1.0 / a)
+    return np.minimum(x - 1.0, n_items - 1).astype(np.int32)
+
+def generate_synthetic_clicks(n_events, seed=42, days=30, end=None, n_posts=None, n_users=None, bot_share=0.0):
+    """Generate n_events realistic click events as time-sorted numpy columns.
+
+    Post popularity and user activity are power-law skewed, each post keeps one
+    platform and badge type, and timestamps follow hour-of-day and weekday profiles.
+    bot_share of the events are crawler-style bursts: extra user ids each hammering
+    one popular post for a few minutes.
+    """
+    rng = np.random.default_rng(seed)
+    n_posts = n_posts or max(25, n_events // 200)
+    n_users = n_users or max(32, n_events // 5)
+    end = end or datetime.now()
+    start_day = datetime.combine(end.date() - timedelta(days=days - 1), datetime.min.time())
+    start = int(start_day.timestamp())
+
+    post_platform = rng.choice(len(PLATFORMS), size=n_posts, p=PLATFORM_MIX).astype(np.int8)
+    post_badge = rng.choice(len(BADGE_TYPES), size=n_posts, p=BADGE_MIX).astype(np.int8)
+    n_bot = int(n_events * bot_share)
+    n_organic = n_events - n_bot
+    post_id = _skewed_choice(rng, n_posts, n_organic, 1.1)
+    user_id = _skewed_choice(rng, n_users, n_organic, 0.8)
+
+    # Spread events over hourly slots with one multinomial draw, then jitter within the hour
+    weekdays = (np.arange(days) + start_day.weekday()) % 7
+    slot_weights = np.outer(WEEKDAY_PROFILE[weekdays], HOURLY_PROFILE).ravel()
+    slot_weights[int(end.timestamp() - start) // 3600:] = 0  # nothing after `end`
+    slot_counts = rng.multinomial(n_organic, slot_weights / slot_weights.sum())
+    offset = np.repeat(np.arange(days * 24, dtype=np.int32) * 3600, slot_counts)
+    offset += rng.integers(0, 3600, size=n_organic, dtype=np.int32)
+    # Attributes are drawn independently of time, so sorting timestamps alone keeps events realistic
+    offset.sort()
+
+    if n_bot:
+        n_bursts = max(1, n_bot // 500)
+        burst = rng.integers(0, n_bursts, size=n_bot)
+        burst_start = rng.integers(0, max(1, int(end.timestamp()) - start - 300), size=n_bursts)
+        burst_post = rng.integers(0, min(n_posts, 50), size=n_bursts).astype(np.int32)
+        offset = np.concatenate([offset, (burst_start[burst] + rng.integers(0, 300, size=n_bot)).astype(np.int32)])
+        post_id = np.concatenate([post_id, burst_post[burst]])
+        user_id = np.concatenate([user_id, (n_users + burst).astype(np.int32)])
+        order = np.argsort(offset, kind="stable")
+        offset, post_id, user_id = offset[order], post_id[order], user_id[order]
+    timestamp = start + offset.astype(np.int64)
+
+    return {
+        "timestamp": timestamp,
+        "post_id": post_id,
+        "user_id": user_id,
+        "platform": post_platform[post_id],
+        "badge": post_badge[post_id]
+    }
+
+def synthetic_post_url(post_id, platform):
+    """Stable fake URL for a synthetic post."""
+    return f"https://{PLATFORMS[platform]}.com/posts/synthetic-{post_id}"
+
+def summarize_clicks(events, top_k=20, recent=10):
+    """Aggregate click columns into the same shape as the tracking server's /api/analytics."""
+    total_clicks = len(events["timestamp"])
+    if total_clicks == 0:
+        return {'total_clicks': 0, 'unique_users': 0, 'total_posts': 0, 'avg_clicks_per_post': 0,
+                'clicks_by_platform': {}, 'clicks_by_badge_type': {}, 'top_posts': [], 'recent_clicks': []}
+
+    post_clicks = np.bincount(events["post_id"])
+    total_posts = int(np.count_nonzero(post_clicks))
+    platform_clicks = np.bincount(events["platform"], minlength=len(PLATFORMS))
+    badge_clicks = np.bincount(events["badge"], minlength=len(BADGE_TYPES))
+
+    k = min(top_k, len(post_clicks))
+    top_ids = np.argpartition(post_clicks, -k)[-k:]
+    top_ids = top_ids[np.argsort(post_clicks[top_ids])[::-1]]
+    top_ids = top_ids[post_clicks[top_ids] > 0]
+
+    # Events are time-sorted, so the first/last occurrence of a post is its first/last click
+    mask = np.isin(events["post_id"], top_ids, kind="table")
+    top_posts_seq = events["post_id"][mask]
+    top_times = events["timestamp"][mask]
+    top_platform = events["platform"][mask]
+    top_badge = events["badge"][mask]
+    ids, first_idx = np.unique(top_posts_seq, return_index=True)
+    _, last_idx_rev = np.unique(top_posts_seq[::-1], return_index=True)
+    last_idx = len(top_posts_seq) - 1 - last_idx_rev
+    position = {int(p): i for i, p in enumerate(ids)}
+
+    top_posts = []
+    for post_id in top_ids:
+        i = position[int(post_id)]
+        top_posts.append({
+            'post_url': synthetic_post_url(int(post_id), top_platform[first_idx[i]]),
+            'platform': PLATFORMS[top_platform[first_idx[i]]],
+            'badge_type': BADGE_TYPES[top_badge[first_idx[i]]],
+            'clicks': int(post_clicks[post_id]),
+            'first_click': datetime.fromtimestamp(int(top_times[first_idx[i]])).isoformat(),
+            'last_click': datetime.fromtimestamp(int(top_times[last_idx[i]])).isoformat()
+        })
+
+    recent_clicks = []
+    for i in range(max(0, total_clicks - recent), total_clicks):
+        recent_clicks.append({
+            'timestamp': datetime.fromtimestamp(int(events["timestamp"][i])).isoformat(),
+            'platform': PLATFORMS[events["platform"][i]],
+            'badge_type': BADGE_TYPES[events["badge"][i]],
+            'post_url': synthetic_post_url(int(events["post_id"][i]), events["platform"][i]),
+            'username': f"user_{events['user_id'][i]}"
+        })
+
+    return {
+        'total_clicks': total_clicks,
+        'unique_users': int(np.count_nonzero(np.bincount(events["user_id"]))),
+        'total_posts': total_posts,
+        'avg_clicks_per_post': round(total_clicks / total_posts, 2),
+        'clicks_by_platform': {PLATFORMS[i]: int(c) for i, c in enumerate(platform_clicks) if c},
+        'clicks_by_badge_type': {BADGE_TYPES[i]: int(c) for i, c in enumerate(badge_clicks) if c},
+        'top_posts': top_posts,
+        'recent_clicks': recent_clicks
+    }
+
+@st.cache_resource(max_entries=2)
+def load_synthetic_clicks(n_events, seed):
+    """Synthetic events are shared read-only across sessions instead of copied per rerun."""
+    return generate_synthetic_clicks(n_events, seed=seed, bot_share=0.02)
+
+@st.cache_data(max_entries=4)
+def synthetic_analytics(n_events, seed):
+    """Offline-mode analytics summarised from the synthetic event set."""
+    return summarize_clicks(load_synthetic_clicks(n_events, seed))
+
+def local_datetimes(timestamps):
+    """Epoch seconds as naive local datetime64 values, matching datetime.fromtimestamp."""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    # UTC offsets only change on quarter-hour boundaries, so look one up per quarter hour
+    quarters, inverse = np.unique(timestamps // 900, return_inverse=True)
+    offsets = np.array([time.localtime(int(q) * 900).tm_gmtoff for q in quarters], dtype=np.int64)
+    return (timestamps + offsets[inverse]).astype("datetime64[s]")
+
+def click_time_series(timestamps, bin_seconds=60):
+    """Bin sorted epoch-second timestamps into (bin start datetimes, click counts)."""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if len(timestamps) == 0:
+        return np.array([], dtype="datetime64[s]"), np.array([], dtype=np.int64)
+    first = timestamps[0] - timestamps[0] % bin_seconds
+    counts = np.bincount((timestamps - first) // bin_seconds)
+    times = local_datetimes(first + np.arange(len(counts)) * bin_seconds)
+    return times, counts
+
+@st.cache_data(max_entries=4)
+def synthetic_click_series(n_events, seed, bin_seconds=60):
+    """Per-minute click counts for the synthetic event set."""
+    return click_time_series(load_synthetic_clicks(n_events, seed)["timestamp"], bin_seconds)
+
+# ============= ENGAGEMENT HEATMAP =============
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+PLATFORM_INDEX = {name: i for i, name in enumerate(PLATFORMS)}
+BADGE_INDEX = {name: i for i, name in enumerate(BADGE_TYPES)}
+
+class EngagementHeatmap:
+    """Click counts per platform × badge × weekday × hour in fixed-size integer arrays.
+
+    Counters are updated in place as clicks arrive, so rendering never touches raw
+    timestamps. Platforms and badges outside the known lists share a final "other"
+    slot. Clicks flagged as bursts are counted separately so they can be excluded.
+    """
+
+    def __init__(self):
+        self.shape = (len(PLATFORMS) + 1, len(BADGE_TYPES) + 1, 7, 24)
+        self.clicks = np.zeros(self.shape, dtype=np.int64)
+        self.flagged = np.zeros(self.shape, dtype=np.int64)
+        # Fixed local offset taken once; buckets may shift by an hour across a DST change
+        self.utc_offset = time.localtime().tm_gmtoff
+        self._lock = threading.Lock()
+
+    def _cells(self, ts):
+        local = np.asarray(ts, dtype=np.int64) + self.utc_offset
+        # 1970-01-01 was a Thursday (weekday 3)
+        return (local // 86400 + 3) % 7, (local // 3600) % 24
+
+    def add(self, ts, platform, badge, flagged=False):
+        """Count one click from a tracking-server record."""
+        weekday, hour = self._cells(ts)
+        cell = (
+            PLATFORM_INDEX.get(str(platform).lower(), len(PLATFORMS)),
+            BADGE_INDEX.get(str(badge).lower(), len(BADGE_TYPES)),
+            weekday,
+            hour
+        )
+        with self._lock:
+            self.clicks[cell] += 1
+            if flagged:
+                self.flagged[cell] += 1
+
+    def add_columns(self, ts, platform, badge, flagged_rows=()):
+        """Count a batch of synthetic clicks given as columns of platform/badge codes."""
+        weekday, hour = self._cells(ts)
+        flat = np.ravel_multi_index((platform, badge, weekday, hour), self.shape)
+        counts = np.bincount(flat, minlength=self.clicks.size).reshape(self.shape)
+        with self._lock:
+            self.clicks += counts
+            if len(flagged_rows):
+                self.flagged += np.bincount(flat[flagged_rows], minlength=self.clicks.size).reshape(self.shape)
+
+    def snapshot(self):
+        """Consistent copies of the click and flagged-click counters."""
+        with self._lock:
+            return {'clicks': self.clicks.copy(), 'flagged': self.flagged.copy()}
+
+# ============= BOT DETECTION =============
+class SlidingWindowCounter:
+    """Per-key event counts over a sliding window with O(1) updates and bounded memory.
+
+    Each key keeps only its current and previous fixed-window counts; the sliding
+    count is the current count plus the part of the previous window that still
+    overlaps. Keys not seen for longest are evicted beyond max_keys.
+    """
+
+    def __init__(self, window_seconds, max_keys):
+        self.window = window_seconds
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+
+    def add(self, key, ts):
+        """Count one event for key at epoch second ts and return the sliding-window count."""
+        window = self.window
+        slot = ts // window
+        entry = self._entries.get(key)
+        if entry is None:
+            if len(self._entries) >= self.max_keys:
+                self._entries.popitem(last=False)
+            entry = self._entries[key] = [slot, 0, 0]
+        else:
+            self._entries.move_to_end(key)
+            if slot > entry[0]:
+                entry[2] = entry[1] if slot == entry[0] + 1 else 0
+                entry[1] = 0
+                entry[0] = slot
+        entry[1] += 1
+        return entry[1] + entry[2] * (1 - (ts - slot * window) / window)
+
+class ClickBurstDetector:
+    """Flags crawler-style click bursts in a click stream.
+
+    A click is suspicious when its user or its post exceeds a per-window rate.
+    Only the suspicious clicks are tallied, so "filtered" numbers are the raw
+    aggregates minus these tallies (see apply_burst_filter). Memory stays bounded:
+    flagged users go into a HyperLogLog and per-post tallies keep the max_posts
+    most recently flagged posts.
+    """
+
+    def __init__(self, window_seconds=60, user_limit=30, post_limit=300, max_keys=200_000, max_posts=10_000):
+        self.users = SlidingWindowCounter(window_seconds, max_keys)
+        self.posts = SlidingWindowCounter(window_seconds, max_keys)
+        self.user_limit = user_limit
+        self.post_limit = post_limit
+        self.processed = 0
+        self.flagged = 0
+        self.flagged_by_platform = {}
+        self.flagged_by_badge = {}
+        self.flagged_by_post = OrderedDict()
+        self.flagged_users = HyperLogLog()
+        self.max_posts = max_posts
+        self.heatmap = EngagementHeatmap()
+        self.daily_clicks = DailyClickTotals()
+        self._lock = threading.Lock()
+        self._watermark = None
+        self._seen_at_watermark = Counter()
+
+    def _is_burst(self, ts, user, post):
+        suspicious = self.users.add(user, ts) > self.user_limit
+        if self.posts.add(post, ts) > self.post_limit:
+            suspicious = True
+        return suspicious
+
+    def _tally(self, user, post_url, platform, badge):
+        self.flagged += 1
+        self.flagged_by_platform[platform] = self.flagged_by_platform.get(platform, 0) + 1
+        self.flagged_by_badge[badge] = self.flagged_by_badge.get(badge, 0) + 1
+        if post_url in self.flagged_by_post:
+            self.flagged_by_post.move_to_end(post_url)
+        elif len(self.flagged_by_post) >= self.max_posts:
+            self.flagged_by_post.popitem(last=False)
+        self.flagged_by_post[post_url] = self.flagged_by_post.get(post_url, 0) + 1
+        self.flagged_users.add(user)
+
+    def observe(self, ts, user, post_url, platform, badge):
+        """Process one click; returns True when it looks like part of a burst."""
+        self.processed += 1
+        suspicious = self._is_burst(ts, user, post_url)
+        if suspicious:
+            self._tally(user, post_url, platform, badge)
+        self.heatmap.add(ts, platform, badge, suspicious)
+        return suspicious
+
+    def ingest_columns(self, events, chunk_size=50_000):
+        """Replay time-sorted synthetic event columns through the detector."""
+        total = len(events["timestamp"])
+        for lo in range(0, total, chunk_size):
+            hi = min(lo + chunk_size, total)
+            rows = zip(
+                events["timestamp"][lo:hi].tolist(),
+                events["user_id"][lo:hi].tolist(),
+                events["post_id"][lo:hi].tolist(),
+                events["platform"][lo:hi].tolist(),
+                events["badge"][lo:hi].tolist()
+            )
+            with self._lock:
+                is_burst = self._is_burst
+                flagged_rows = []
+                for i, (ts, user, post, platform, badge) in enumerate(rows):
+                    if is_burst(ts, user, post):
+                        # Names and URLs are only built for the rare flagged clicks
+                        self._tally(user, synthetic_post_url(post, platform), PLATFORMS[platform], BADGE_TYPES[badge])
+                        flagged_rows.append(i)
+                flagged_rows = np.array(flagged_rows, dtype=np.intp)
+                self.heatmap.add_columns(
+                    events["timestamp"][lo:hi], events["platform"][lo:hi], events["badge"][lo:hi], flagged_rows
+                )
+                self.daily_clicks.add_columns(events["timestamp"][lo:hi], flagged_rows)
+                self.processed += hi - lo
+        return f"Screened {total:,} clicks: {self.flagged:,} suspicious"
+
+    def ingest_records(self, records):
+        """Feed tracking-server click records, skipping ones already seen on earlier reruns.
+
+        Identical records within one poll are separate clicks (a crawler can hit the
+        same post many times a second). Only clicks older than the newest one from
+        earlier polls are skipped; at that exact timestamp, a record is new when this
+        poll holds more copies of it than earlier polls did.
+        """
+        rows = []
+        for click in records:
+            try:
+                when = datetime.fromisoformat(click['timestamp']).timestamp()
+            except (KeyError, TypeError, ValueError):
+                continue
+            fields = (click.get('username', ''), click.get('post_url', ''),
+                      click.get('platform', 'unknown'), click.get('badge_type', 'unknown'))
+            # Full-precision timestamp string plus the click id when the server sends one
+            key = (click['timestamp'], click.get('id', click.get('click_id'))) + fields
+            rows.append((when, key, fields))
+        rows.sort(key=lambda row: row[0])
+        with self._lock:
+            watermark = self._watermark
+            seen = self._seen_at_watermark
+            at_watermark = Counter()
+            for when, key, fields in rows:
+                if watermark is not None and when < watermark:
+                    continue
+                if when == watermark:
+                    at_watermark[key] += 1
+                    if at_watermark[key] <= seen[key]:
+                        continue
+                self.observe(int(when), *fields)
+            if rows and (watermark is None or rows[-1][0] > watermark):
+                self._watermark = rows[-1][0]
+                self._seen_at_watermark = Counter(key for when, key, _ in rows if when == self._watermark)
+            else:
+                self._seen_at_watermark = seen | at_watermark
+
+    def snapshot(self):
+        """Consistent copy of the suspicious-click tallies."""
+        with self._lock:
+            return {
+                'processed': self.processed,
+                'flagged': self.flagged,
+                'by_platform': dict(self.flagged_by_platform),
+                'by_badge': dict(self.flagged_by_badge),
+                'by_post': dict(self.flagged_by_post),
+                'users': self.flagged_users.estimate(),
+                'users_hll': self.flagged_users.registers.copy()
+            }
+
+def apply_burst_filter(analytics, flagged):
+    """Analytics with the detector's suspicious clicks subtracted from every count."""
+    filtered = dict(analytics)
+    total = max(0, analytics.get('total_clicks', 0) - flagged['flagged'])
+    filtered['total_clicks'] = total
+    filtered['clicks_by_platform'] = {
+        k: max(0, v - flagged['by_platform'].get(k, 0)) for k, v in (analytics.get('clicks_by_platform') or {}).items()
+    }
+    filtered['clicks_by_badge_type'] = {
+        k: max(0, v - flagged['by_badge'].get(k, 0)) for k, v in (analytics.get('clicks_by_badge_type') or {}).items()
+    }
+    top_posts = [
+        dict(post, clicks=max(0, post.get('clicks', 0) - flagged['by_post'].get(post.get('post_url'), 0)))
+        for post in analytics.get('top_posts') or []
+    ]
+    filtered['top_posts'] = sorted(top_posts, key=lambda p: p['clicks'], reverse=True)
+    if analytics.get('total_posts'):
+        filtered['avg_clicks_per_post'] = round(total / analytics['total_posts'], 2)
+    return filtered
+
+def merge_flagged(snapshots):
+    """Sum several detector snapshots into one."""
+    merged = {'processed': 0, 'flagged': 0, 'by_platform': {}, 'by_badge': {}, 'by_post': {}}
+    users = HyperLogLog()
+    for snapshot in snapshots:
+        for key in ('processed', 'flagged'):
+            merged[key] += snapshot[key]
+        users.merge(HyperLogLog(registers=snapshot['users_hll']))
+        for key in ('by_platform', 'by_badge', 'by_post'):
+            for name, count in snapshot[key].items():
+                merged[key][name] = merged[key].get(name, 0) + count
+    merged['users'] = users.estimate()
+    merged['users_hll'] = users.registers
+    return merged
+
+@st.cache_resource
+def get_live_detector(server):
+    """Detector state for one tracking server, kept across reruns and sessions."""
+    return ClickBurstDetector()
+
+@st.cache_resource(max_entries=2)
+def load_synthetic_detector(n_events, seed):
+    """Screen a synthetic event set once, on the screening queue."""
+    detector = ClickBurstDetector()
+    job_id = get_screening_queue().submit(
+        "Screening synthetic clicks",
+        detector.ingest_columns,
+        load_synthetic_clicks(n_events, seed),
+        timeout=600
+    )
+    return detector, job_id
+
+# ============= DOWNSAMPLING =============
+MAX_CHART_POINTS = 2000
+
+def minmax_indices(y, n_out):
+    """Indices keeping the min and max of each of n_out/2 equal buckets (plus both endpoints)."""
+    n = len(y)
+    n_buckets = max(1, (n_out - 2) // 2)
+    size = -(-n // n_buckets)
+    # Pad the tail with the last value so every bucket can be reduced in one reshape
+    padded = np.concatenate([y, np.repeat(y[-1:], n_buckets * size - n)]).reshape(n_buckets, size)
+    base = np.arange(n_buckets) * size
+    idx = np.concatenate([[0, n - 1], base + padded.argmin(axis=1), base + padded.argmax(axis=1)])
+    return np.unique(np.minimum(idx, n - 1))
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets point selection.
+
+    Bucket edges and next-bucket averages are computed for all buckets at once;
+    only the choice of each bucket's point depends on the previous pick.
+    """
+    n = len(y)
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Average point of each bucket, used as the third triangle vertex for the bucket before it
+    sums_x = np.add.reduceat(x[:n - 1], edges[:-1])
+    sums_y = np.add.reduceat(y[:n - 1], edges[:-1])
+    widths = np.diff(edges)
+    avg_x = np.append(sums_x / widths, x[-1])[1:]
+    avg_y = np.append(sums_y / widths, y[-1])[1:]
+
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    prev = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[prev] - avg_x[b]) * (by - y[prev]) - (x[prev] - bx) * (avg_y[b] - y[prev]))
+        prev = lo + int(area.argmax())
+        idx[b + 1] = prev
+    return idx
+
+def downsample(x, y, n_out=MAX_CHART_POINTS, method="lttb"):
+    """Reduce a time series to at most n_out points for plotting; short series pass through."""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(y) <= n_out or n_out < 3:
+        return x, y
+    if method == "minmax":
+        idx = minmax_indices(y, n_out)
+    else:
+        x_num = x.astype("datetime64[s]").astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x
+        idx = lttb_indices(x_num, y, n_out)
+    return x[idx], y[idx]
+
+def render_time_series(times, values, key, title, y_title, color='#667eea'):
+    """Plot a time series through the downsampler, with a range slider that refines on zoom.
+
+    Narrowing the range re-downsamples just that window, so detail increases as the
+    window shrinks while the browser never receives more than MAX_CHART_POINTS points.
+    """
+    if len(times) == 0:
+        st.info("No time-series data yet")
+        return
+    start, end = pd.Timestamp(times[0]).to_pydatetime(), pd.Timestamp(times[-1]).to_pydatetime()
+    col_range, col_method = st.columns([4, 1])
+    with col_method:
+        method = st.selectbox("Downsampling", ["lttb", "minmax"], key=f"{key}_method",
+                              format_func=lambda m: {"lttb": "LTTB", "minmax": "Min-Max"}[m])
+    with col_range:
+        if start < end:
+            window = st.slider("Time Range", min_value=start, max_value=end, value=(start, end),
+                               format="YYYY-MM-DD HH:mm", key=f"{key}_range")
+        else:
+            window = (start, end)
+    lo, hi = np.searchsorted(times, np.datetime64(window[0]), side="left"), np.searchsorted(times, np.datetime64(window[1]), side="right")
+    x, y = downsample(times[lo:hi], values[lo:hi], method=method)
+
+    fig = go.Figure(go.Scattergl(x=x, y=y, mode='lines', line=dict(color=color, width=1.5)))
+    fig.update_layout(
+        title=title,
+        height=350,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        yaxis_title=y_title,
+        margin=dict(t=40)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Showing {len(x):,} of {hi - lo:,} points")
+
+# ============= COST MODEL =============
+# Unit prices in USD. Badge keys are per badge; meme/blog keys are per item except the
+# instagram_*/news_* scrape + embedding costs, which are paid once per data refresh.
+UNIT_PRICES = {
+    "scraping": 0.00605,
+    "search": 0.00001,
+    "caption_single": 0.00189,
+    "caption_retry": 0.00945,
+    "posting": 0.00,
+    "instagram_scraping_cost": 0.69,
+    "instagram_embedding_cost": 0.00648,
+    "meme_query_embedding_cost": 0.000004,
+    "meme_text_generation_cost": 0.012,
+    "meme_image_generation_cost": 0.039,
+    "news_scraping_cost": 1.60,
+    "news_embedding_cost": 0.00115,
+    "book_embedding_cost": 0.0012,
+    "youtube_embedding_cost": 0.00096,
+    "blog_gemini_input_cost": 0.005,
+    "blog_gemini_output_cost": 0.012
+}
+
+REFRESH_DAYS = {
+    "Daily": 1,
+    "Weekly": 7,
+    "Monthly": 30
+}
+
+def daily_cost_model(prices, badges, memes, blogs, ig_refresh_days, news_refresh_days, badge_retry):
+    """Daily cost per pipeline.
+
+    Every argument (including each price) may be a scalar or a numpy array; arrays
+    broadcast, so one call can evaluate a whole grid of plans or price scenarios.
+    """
+    caption = badge_retry * prices["caption_retry"] + (1 - badge_retry) * prices["caption_single"]
+    badge_per_item = prices["scraping"] + prices["search"] + caption + prices["posting"]
+    meme_per_item = (prices["meme_query_embedding_cost"] + prices["meme_text_generation_cost"]
+                     + prices["meme_image_generation_cost"])
+    blog_per_item = (prices["book_embedding_cost"] + prices["youtube_embedding_cost"]
+                     + prices["blog_gemini_input_cost"] + prices["blog_gemini_output_cost"])
+    ig_infra = (prices["instagram_scraping_cost"] + prices["instagram_embedding_cost"]) / ig_refresh_days
+    news_infra = (prices["news_scraping_cost"] + prices["news_embedding_cost"]) / news_refresh_days
+
+    badge = badge_per_item * badges
+    meme = meme_per_item * memes + ig_infra
+    blog = blog_per_item * blogs + news_infra
+    return {
+        "badge_per_item": badge_per_item,
+        "meme_per_item": meme_per_item,
+        "blog_per_item": blog_per_item,
+        "badge": badge,
+        "meme": meme,
+        "blog": blog,
+        "total": badge + meme + blog
+    }
+
+def optimize_plan(prices, monthly_budget, bounds, badge_retry, objective="posts", clicks_per_post=None, cadences=None):
+    """Find the volumes and refresh cadences that fit a monthly budget.
+
+    bounds maps "badges"/"memes"/"blogs" to (min, max) daily volumes. objective is
+    "posts" (most posts per month) or "cpc" (lowest cost per expected click, using
+    clicks_per_post for each pipeline). cadences limits the refresh options tried.
+    Memes x blogs x both cadences are evaluated as one broadcast grid; badge volume
+    is solved in closed form per grid cell instead of being enumerated, and cells
+    whose minimum plan already breaks the budget are pruned before scoring.
+    If no feasible plan earns any clicks, "cpc" falls back to "posts" and the
+    result's objective says so. Returns None when nothing fits.
+    """
+    daily_budget = monthly_budget / 30
+    cadences = list(cadences or REFRESH_DAYS)
+    ig_days = np.array([REFRESH_DAYS[c] for c in cadences], dtype=np.float64)[:, None, None, None]
+    news_days = np.array([REFRESH_DAYS[c] for c in cadences], dtype=np.float64)[None, :, None, None]
+    memes = np.arange(bounds["memes"][0], bounds["memes"][1] + 1)[None, None, :, None]
+    blogs = np.arange(bounds["blogs"][0], bounds["blogs"][1] + 1)[None, None, None, :]
+    b_min, b_max = bounds["badges"]
+
+    # Cost of everything except badges, for every (ig cadence, news cadence, memes, blogs) cell
+    grid = daily_cost_model(prices, 0, memes, blogs, ig_days, news_days, badge_retry)
+    badge_unit = grid["badge_per_item"]
+    rest = grid["meme"] + grid["blog"]
+    affordable = np.floor((daily_budget - rest) / badge_unit) if badge_unit > 0 else np.full(rest.shape, b_max)
+    feasible = affordable >= b_min
+    n_cells = feasible.size
+    if not feasible.any():
+        return None
+    badges_hi = np.minimum(affordable, b_max)
+
+    memes_b = np.broadcast_to(memes, rest.shape)
+    blogs_b = np.broadcast_to(blogs, rest.shape)
+    best = None
+    if objective == "cpc":
+        k = clicks_per_post or {"badges": 1.0, "memes": 1.0, "blogs": 1.0}
+        other_clicks = memes_b * k["memes"] + blogs_b * k["blogs"]
+        # Cost per click is a ratio of two linear functions of badge volume, so it is
+        # monotone in badges and the optimum sits at one end of the feasible range
+        candidates = np.stack([np.full(rest.shape, float(b_min)), badges_hi])
+        cost = rest + candidates * badge_unit
+        clicks = other_clicks + candidates * k["badges"]
+        score = np.where(clicks > 0, cost / np.maximum(clicks, 1e-12), np.inf)
+        end = score.argmin(axis=0)
+        badges = np.where(end == 0, float(b_min), badges_hi)
+        score = np.where(feasible, np.take_along_axis(score, end[None], axis=0)[0], np.inf)
+        if np.isfinite(score).any():
+            best = np.unravel_index(np.argmin(score), score.shape)
+        else:
+            # No feasible plan gets a click, so cost per click cannot rank them
+            objective = "posts"
+    if best is None:
+        badges = badges_hi
+        posts = np.where(feasible, badges + memes_b + blogs_b, -1)
+        # Among plans with the most posts, prefer the cheapest
+        cost = rest + badges * badge_unit
+        top = posts == posts.max()
+        best = np.unravel_index(np.argmin(np.where(top, cost, np.inf)), cost.shape)
+
+    i, j = best[0], best[1]
+    plan_badges = int(badges[best])
+    plan_memes = int(memes_b[best])
+    plan_blogs = int(blogs_b[best])
+    daily = float(rest[best] + plan_badges * badge_unit)
+    result = {
+        "badges": plan_badges,
+        "memes": plan_memes,
+        "blogs": plan_blogs,
+        "instagram_refresh": cadences[i],
+        "news_refresh": cadences[j],
+        "daily_cost": daily,
+        "monthly_cost": daily * 30,
+        "monthly_posts": (plan_badges + plan_memes + plan_blogs) * 30,
+        "objective": objective,
+        "plans_evaluated": n_cells,
+        "plans_feasible": int(feasible.sum())
+    }
+    if clicks_per_post:
+        clicks = (plan_badges * clicks_per_post["badges"] + plan_memes * clicks_per_post["memes"]
+                  + plan_blogs * clicks_per_post["blogs"])
+        result["cost_per_click"] = daily / clicks if clicks else None
+    return result
+
+def price_sensitivity(prices, steps, **plan):
+    """Monthly cost with each unit price scaled by every relative step, from one model call.
+
+    steps are fractional changes (e.g. -0.2..0.2). Each price becomes a (prices x steps)
+    array that is perturbed only on its own row, so the broadcast evaluation returns
+    the full sensitivity matrix at once. plan holds the daily_cost_model volume,
+    cadence and retry arguments.
+    """
+    names = list(prices)
+    steps = np.asarray(steps, dtype=np.float64)
+    own_row = np.eye(len(names))[:, :, None]
+    batched = {
+        name: prices[name] * (1 + own_row[:, k] * steps[None, :])
+        for k, name in enumerate(names)
+    }
+    return names, daily_cost_model(batched, **plan)["total"] * 30
+
+# ============= COST LEDGER =============
+LEDGER_FIELDS = [
+    "date", "badge_count", "meme_count", "blog_count", "badge_retry", "instagram_refresh",
+    "news_refresh", "badge_cost", "meme_cost", "blog_cost", "total_cost", "posts"
+]
+
+class CostLedger:
+    """CSV of daily cost snapshots, one row per day, with month/year rollups kept alongside.
+
+    The rollups live in a small JSON file that is adjusted in O(1) per recorded day,
+    so month-to-date, year-to-date and per-month totals never rescan the ledger.
+    Recording the latest day again rewrites its row in place. The rollups remember
+    the last row they cover and are rebuilt from the CSV when it disagrees, e.g.
+    after a crash between the two writes.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.ledger_path = self.directory / "ledger.csv"
+        self.rollup_path = self.directory / "rollups.json"
+        self._lock = threading.Lock()
+        self.rollups = self._load_rollups()
+
+    def _load_rollups(self):
+        rollups = None
+        if self.rollup_path.exists():
+            with open(self.rollup_path) as f:
+                rollups = json.load(f)
+        _, last_row = self._tail()
+        if rollups is not None and self._covers(rollups["last"], last_row):
+            return rollups
+        # Rollups are derived data: rebuild them if missing or behind the ledger
+        rollups = {"months": {}, "years": {}, "last": None}
+        rows = self.rows()
+        for row in rows:
+            self._apply(rollups, row["date"], float(row["total_cost"]), int(row["posts"]))
+        if last_row is not None:
+            # Also compacts ledgers written before re-recorded days were rewritten in place
+            tmp_path = self.ledger_path.with_suffix(".tmp")
+            with open(tmp_path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=LEDGER_FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
+            os.replace(tmp_path, self.ledger_path)
+            self._save_rollups(rollups)
+        return rollups
+
+    @staticmethod
+    def _covers(last, row):
+        if last is None or row is None:
+            return last is None and row is None
+        return (row["date"] == last["date"] and float(row["total_cost"]) == last["cost"]
+                and int(row["posts"]) == last["posts"])
+
+    def _tail(self):
+        """Byte offset and values of the ledger's last row, or (None, None) without rows."""
+        if not self.ledger_path.exists():
+            return None, None
+        with open(self.ledger_path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            start = max(0, size - 4096)
+            f.seek(start)
+            block = f.read()
+        body = block.rstrip(b"\r\n")
+        line_start = body.rfind(b"\n") + 1
+        values = next(csv.reader([body[line_start:].decode("utf-8")]), None)
+        if not values or values == LEDGER_FIELDS:
+            return None, None
+        return start + line_start, dict(zip(LEDGER_FIELDS, values))
+
+    def _save_rollups(self, rollups):
+        tmp_path = self.rollup_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(rollups, f)
+        os.replace(tmp_path, self.rollup_path)
+
+    @staticmethod
+    def _apply(rollups, day, cost, posts):
+        last = rollups["last"]
+        if last and last["date"] == day:
+            for key, bucket in (("months", day[:7]), ("years", day[:4])):
+                totals = rollups[key][bucket]
+                totals["cost"] -= last["cost"]
+                totals["posts"] -= last["posts"]
+                totals["days"] -= 1
+        for key, bucket in (("months", day[:7]), ("years", day[:4])):
+            totals = rollups[key].setdefault(bucket, {"cost": 0.0, "posts": 0, "days": 0})
+            totals["cost"] += cost
+            totals["posts"] += posts
+            totals["days"] += 1
+        rollups["last"] = {"date": day, "cost": cost, "posts": posts}
+
+    def record(self, day, snapshot):
+        """Write one day's snapshot (a dict with LEDGER_FIELDS minus date) and update rollups."""
+        day = day.isoformat()
+        with self._lock:
+            last = self.rollups["last"]
+            if last and day < last["date"]:
+                raise ValueError(f"Ledger already has {last['date']}; only the latest day can be recorded")
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if last and day == last["date"]:
+                # Re-recording the latest day: drop its row so the file keeps one row per day
+                offset, last_row = self._tail()
+                if last_row is not None and last_row["date"] == day:
+                    with open(self.ledger_path, "r+b") as f:
+                        f.truncate(offset)
+            new_file = not self.ledger_path.exists()
+            with open(self.ledger_path, "a", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=LEDGER_FIELDS)
+                if new_file:
+                    writer.writeheader()
+                writer.writerow({"date": day, **snapshot})
+            self._apply(self.rollups, day, float(snapshot["total_cost"]), int(snapshot["posts"]))
+            self._save_rollups(self.rollups)
+
+    def rows(self):
+        """Ledger rows, oldest first, with re-recorded days collapsed to their latest entry."""
+        if not self.ledger_path.exists():
+            return []
+        with open(self.ledger_path, newline="") as f:
+            latest = {row["date"]: row for row in csv.DictReader(f)}
+        return list(latest.values())
+
+    def period_totals(self, day):
+        """Month-to-date and year-to-date totals for the period containing day."""
+        empty = {"cost": 0.0, "posts": 0, "days": 0}
+        with self._lock:
+            month = dict(self.rollups["months"].get(day.isoformat()[:7], empty))
+            year = dict(self.rollups["years"].get(day.isoformat()[:4], empty))
+        return month, year
+
+    def last_recorded(self):
+        """Date of the latest recorded day, or None for an empty ledger."""
+        with self._lock:
+            last = self.rollups["last"]
+        return datetime.fromisoformat(last["date"]).date() if last else None
+
+    def monthly_totals(self):
+        """Copy of the per-month rollups keyed by YYYY-MM."""
+        with self._lock:
+            return {month: dict(totals) for month, totals in sorted(self.rollups["months"].items())}
+
+@st.cache_resource
+def get_cost_ledger():
+    """One ledger handle per server process."""
+    return CostLedger(LEDGER_DIR)
+
+# ============= FORECASTING =============
+EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+class HoltWinters:
+    """Additive Holt-Winters forecaster for a daily series with weekly seasonality.
+
+    Each observation updates level, trend and that weekday's seasonal term in O(1);
+    one-step-ahead errors feed an EWMA of squared residuals that sizes the intervals.
+    Days are date ordinals. A skipped day only advances the trend, observing the
+    latest day again replaces it, and days older than the latest are ignored.
+    """
+
+    def __init__(self, alpha=0.3, beta=0.05, gamma=0.2, rho=0.1, season=7, history=365):
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.rho = rho
+        self.season = season
+        self.level = None
+        self.trend = 0.0
+        self.seasonal = np.zeros(season)
+        self.resid_var = 0.0
+        self.last_day = None
+        self.history = deque(maxlen=history)
+        self._warmup = []
+        self._previous = None
+        self._lock = threading.Lock()
+
+    def _state(self):
+        return self.level, self.trend, self.seasonal.copy(), self.resid_var, self.last_day, list(self._warmup)
+
+    def update(self, day, value):
+        """Observe value for day; returns False when day is older than the latest one seen."""
+        with self._lock:
+            if self.last_day is not None and day < self.last_day:
+                return False
+            if day == self.last_day:
+                self.level, self.trend, self.seasonal, self.resid_var, self.last_day, self._warmup = self._previous
+                self.history.pop()
+            self._previous = self._state()
+            self.history.append((day, value))
+            if self.level is None:
+                self._warm_up(day, value)
+            else:
+                self._observe(day, value)
+            self.last_day = day
+            return True
+
+    def _warm_up(self, day, value):
+        # Collect the first week, then start from its mean and weekday offsets
+        self._warmup.append((day, value))
+        if day - self._warmup[0][0] < self.season - 1:
+            return
+        values = np.array([v for _, v in self._warmup], dtype=float)
+        self.level = values.mean()
+        for d, v in self._warmup:
+            self.seasonal[d % self.season] = v - self.level
+        self.resid_var = values.var()
+        self._warmup = []
+
+    def _observe(self, day, value):
+        self.level += (day - self.last_day - 1) * self.trend
+        slot = day % self.season
+        seasonal = self.seasonal[slot]
+        error = value - (self.level + self.trend + seasonal)
+        self.resid_var = (1 - self.rho) * self.resid_var + self.rho * error * error
+        level = self.alpha * (value - seasonal) + (1 - self.alpha) * (self.level + self.trend)
+        self.trend = self.beta * (level - self.level) + (1 - self.beta) * self.trend
+        self.seasonal[slot] = self.gamma * (value - level) + (1 - self.gamma) * seasonal
+        self.level = level
+
+    def forecast(self, start, horizon):
+        """Mean and variance arrays for the horizon days from start, or None before any data."""
+        with self._lock:
+            if self.level is None:
+                if not self._warmup:
+                    return None
+                values = np.array([v for _, v in self._warmup], dtype=float)
+                return np.full(horizon, values.mean()), np.full(horizon, values.var())
+            days = start + np.arange(horizon)
+            steps = np.maximum(days - self.last_day, 1)
+            mean = self.level + steps * self.trend + self.seasonal[days % self.season]
+            # Error variance grows with the horizon as level, trend and season updates accumulate
+            j = np.arange(1, steps.max())
+            weights = self.alpha * (1 + j * self.beta) + self.gamma * (j % self.season == 0)
+            growth = np.concatenate([[0.0], np.cumsum(weights ** 2)])
+            return mean, self.resid_var * (1 + growth[steps - 1])
+
+    def recent(self):
+        """Copy of the observed (day, value) history, oldest first."""
+        with self._lock:
+            return list(self.history)
+
+class DailyClickTotals:
+    """Counts clicks for the current day and closes finished days into a forecaster.
+
+    Clicks should arrive roughly in time order: a click on a later day closes the
+    open day, with any days in between closed as zero-click days. Clicks for days
+    already closed are dropped.
+    """
+
+    def __init__(self):
+        self.forecaster = HoltWinters()
+        self.utc_offset = time.localtime().tm_gmtoff
+        self.open_day = None
+        self.open_count = 0
+
+    def day_of(self, ts):
+        """Local date ordinal of epoch-second timestamp(s)."""
+        return (ts + self.utc_offset) // 86400 + EPOCH_ORDINAL
+
+    def add(self, day, count=1):
+        if self.open_day is None:
+            self.open_day = day
+        if day > self.open_day:
+            self.forecaster.update(self.open_day, self.open_count)
+            for silent_day in range(self.open_day + 1, day):
+                self.forecaster.update(silent_day, 0)
+            self.open_day, self.open_count = day, 0
+        if day == self.open_day:
+            self.open_count += count
+
+    def add_columns(self, ts, exclude_rows=()):
+        """Count a time-sorted batch of click timestamps, leaving out the rows in exclude_rows."""
+        days = self.day_of(np.asarray(ts, dtype=np.int64))
+        if len(days) == 0:
+            return
+        first = int(days[0])
+        counts = np.bincount(days - first)
+        if len(exclude_rows):
+            counts -= np.bincount(days[exclude_rows] - first, minlength=len(counts))
+        for offset, count in enumerate(counts.tolist()):
+            self.add(first + offset, count)
+
+    def clicks_so_far(self, day):
+        """Clicks counted so far on day if it is the open day, else 0."""
+        return self.open_count if self.open_day == day else 0
+
+class ClickCounterDays:
+    """Daily click totals derived from a tracking server's running total_clicks counter.
+
+    The counter value at each midnight crossed between two polls is interpolated, and
+    a day's clicks are the difference between its two midnights. Days whose start or
+    end falls in a polling gap longer than max_gap, including the day the dashboard
+    started watching, are left out instead of being counted partially. A counter that
+    goes down means the server was reset, so the open day is dropped.
+    """
+
+    def __init__(self, max_gap=6 * 3600):
+        self.forecaster = HoltWinters()
+        self.max_gap = max_gap
+        self.last_poll = None
+        self.day_start = None
+        self._lock = threading.Lock()
+
+    def observe(self, ts, total):
+        """Record the counter value total seen at epoch second ts."""
+        with self._lock:
+            if self.last_poll is None:
+                self.last_poll = (ts, total)
+                return
+            last_ts, last_total = self.last_poll
+            if ts <= last_ts:
+                return  # the same cached poll seen again
+            self.last_poll = (ts, total)
+            if total < last_total:
+                self.day_start = None
+                return
+            last_day = datetime.fromtimestamp(last_ts).toordinal()
+            day = datetime.fromtimestamp(ts).toordinal()
+            if day == last_day:
+                return
+            if day > last_day + 1 or ts - last_ts > self.max_gap:
+                self.day_start = None
+                return
+            midnight = datetime.fromordinal(day).timestamp()
+            at_midnight = last_total + (total - last_total) * (midnight - last_ts) / (ts - last_ts)
+            if self.day_start is not None and self.day_start[0] == last_day:
+                self.forecaster.update(last_day, at_midnight - self.day_start[1])
+            self.day_start = (day, at_midnight)
+
+    def clicks_so_far(self, day):
+        """Clicks since midnight on day, when that midnight was observed."""
+        with self._lock:
+            if self.day_start is None or self.day_start[0] != day:
+                return 0
+            return int(round(self.last_poll[1] - self.day_start[1]))
+
+@st.cache_resource
+def get_click_counter_days(server):
+    """Daily click history for one tracking server, kept across reruns and sessions."""
+    return ClickCounterDays()
+
+@st.cache_resource
+def get_cost_forecaster():
+    """Daily-cost forecaster seeded from the ledger once, then updated as days are recorded."""
+    forecaster = HoltWinters()
+    for row in get_cost_ledger().rows():
+        forecaster.update(datetime.fromisoformat(row["date"]).toordinal(), float(row["total_cost"]))
+    return forecaster
+
+def forecast_bands(forecasts, z=1.96):
+    """Sum independent (mean, variance) forecasts into a mean with a ~95% interval, floored at zero."""
+    mean = sum(f[0] for f in forecasts)
+    spread = z * np.sqrt(sum(f[1] for f in forecasts))
+    return mean, np.maximum(mean - spread, 0), mean + spread
+
+def forecast_figure(history, start, mean, lower, upper, y_title, color='#667eea'):
+    """History line plus forecast mean and interval band."""
+    days = [datetime.fromordinal(start + i) for i in range(len(mean))]
+    fig = go.Figure()
+    if history:
+        fig.add_trace(go.Scatter(
+            x=[datetime.fromordinal(day) for day, _ in history], y=[value for _, value in history],
+            name="Observed", mode='lines', line=dict(color=color)
+        ))
+    fig.add_trace(go.Scatter(
+        x=days + days[::-1], y=np.concatenate([upper, lower[::-1]]), fill='toself',
+        fillcolor='rgba(240, 147, 251, 0.25)', line=dict(width=0), name="95% interval", hoverinfo='skip'
+    ))
+    fig.add_trace(go.Scatter(
+        x=days, y=mean, name="Forecast", mode='lines+markers', line=dict(color='#f093fb', dash='dash')
+    ))
+    fig.update_layout(
+        height=350,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        yaxis_title=y_title,
+        legend=dict(orientation='h', y=-0.2)
+    )
+    return fig
+
+# ============= REPORT EXPORT =============
+EXPORT_FORMATS = {"CSV": "csv", "HTML": "html"}
+EXPORT_MAX_AGE = 24 * 3600
+if pq is not None:
+    EXPORT_FORMATS["Parquet"] = "zip"
+
+REPORT_CSS = """
+body { font-family: -apple-system, Segoe UI, Roboto, sans-serif; margin: 2rem; color: #222; }
+h1 { color: #764ba2; }
+h2 { margin-top: 2rem; border-bottom: 2px solid #667eea; padding-bottom: 4px; }
+table { border-collapse: collapse; margin: 10px 0; }
+th, td { border: 1px solid #ddd; padding: 6px 10px; text-align: left; }
+th { background: #f3f0ff; }
+"""
+
+def report_sections(tables, events=None, chunk_size=100_000):
+    """Yield (section title, DataFrame) pieces: each table whole, then click events in chunks."""
+    for title, table in tables.items():
+        yield title, table
+    if events is None:
+        return
+    for lo in range(0, len(events["timestamp"]), chunk_size):
+        hi = lo + chunk_size
+        yield "Click Events", pd.DataFrame({
+            "timestamp": local_datetimes(events["timestamp"][lo:hi]),
+            "post_id": events["post_id"][lo:hi],
+            "user_id": events["user_id"][lo:hi],
+            "platform": pd.Categorical.from_codes(events["platform"][lo:hi], PLATFORMS),
+            "badge_type": pd.Categorical.from_codes(events["badge"][lo:hi], BADGE_TYPES)
+        })
+
+def write_csv_report(sections, path):
+    """One CSV file with a '# title' line and header before each section."""
+    rows, current = 0, None
+    with open(path, "w", newline="") as f:
+        for title, chunk in sections:
+            new_section = title != current
+            if new_section:
+                if current is not None:
+                    f.write("\n")
+                f.write(f"# {title}\n")
+                current = title
+            chunk.to_csv(f, index=False, header=new_section)
+            rows += len(chunk)
+    return rows
+
+def write_parquet_report(sections, path):
+    """A zip holding one Parquet file per section, each chunk written as a row group."""
+    rows, current, writer, part = 0, None, None, None
+    with zipfile.ZipFile(path, "w") as archive, tempfile.TemporaryDirectory() as tmp:
+        def close_part():
+            writer.close()
+            archive.write(part, arcname=part.name)
+            part.unlink()
+
+        for title, chunk in sections:
+            # Nullable strings keep missing values (e.g. first_click=None) as nulls
+            table = pa.Table.from_pandas(chunk.astype({c: "string" for c in chunk.columns if chunk[c].dtype == object}),
+                                         preserve_index=False)
+            if title != current:
+                if writer is not None:
+                    close_part()
+                current = title
+                part = Path(tmp) / (re.sub(r"[^a-z0-9]+", "_", title.lower()).strip("_") + ".parquet")
+                writer = pq.ParquetWriter(part, table.schema)
+            writer.write_table(table.cast(writer.schema))
+            rows += len(chunk)
+        if writer is not None:
+            close_part()
+    return rows
+
+def write_html_report(sections, path):
+    """A single self-contained HTML page (inline CSS, no scripts), written row by row."""
+    rows, current = 0, None
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Cost Dashboard Report</title>"
+                f"<style>{REPORT_CSS}</style></head><body>\n"
+                f"<h1>💰 Social Media Automation Cost Report</h1>"
+                f"<p>Generated {datetime.now():%Y-%m-%d %H:%M}</p>\n")
+        for title, chunk in sections:
+            if title != current:
+                if current is not None:
+                    f.write("</tbody></table>\n")
+                f.write(f"<h2>{html.escape(title)}</h2><table><thead><tr>")
+                f.write("".join(f"<th>{html.escape(str(c))}</th>" for c in chunk.columns))
+                f.write("</tr></thead><tbody>\n")
+                current = title
+            for row in chunk.itertuples(index=False):
+                f.write("<tr>" + "".join(f"<td>{html.escape(str(v))}</td>" for v in row) + "</tr>\n")
+            rows += len(chunk)
+        if current is not None:
+            f.write("</tbody></table>\n")
+        f.write("</body></html>\n")
+    return rows
+
+def prune_exports(directory, max_age=EXPORT_MAX_AGE):
+    """Delete report files in directory older than max_age seconds, e.g. from ended sessions."""
+    cutoff = time.time() - max_age
+    for path in directory.glob("cost-report-*"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            continue
+
+def export_report_job(tables, events, fmt, path):
+    """Background job: stream the report to path in the chosen format."""
+    writer = {"CSV": write_csv_report, "Parquet": write_parquet_report, "HTML": write_html_report}[fmt]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    prune_exports(path.parent)
+    rows = writer(report_sections(tables, events), path)
+    return f"{fmt} report ready: {rows:,} rows, {path.stat().st_size / 1e6:.1f} MB"
+
 # Header
 st.title("💰 Social Media Automation Cost Dashboard")
 st.markdown("**Complete cost analysis for Badges, Memes & Blog automation + Real-time Click Analytics**")
 
+# Sidebar controls
+st.sidebar.header("⚙️ Configuration")
+
+st.sidebar.subheader("🌐 Tracking Servers")
+server_lines = st.sidebar.text_area(
+    "Server URLs (one per line)",
+    value="\n".join(TRACKING_SERVERS),
+    help="Analytics from every server are fetched in parallel and merged into one view"
+)
+tracking_servers = tuple(dict.fromkeys(line.strip() for line in server_lines.splitlines() if line.strip()))
+source_timeout = st.sidebar.slider("Per-Server Timeout (s)", min_value=1, max_value=10, value=3)
+
 # Check server status
-server_running = check_server_status()
+source_results = fetch_federated_analytics(tracking_servers, source_timeout)
+live_sources = [result for result in source_results if result["status"] == "ok"]
+server_running = bool(live_sources)
 
-if server_running:
-    st.success(f"✅ Tracking Server Active:")
-    
+if server_running and len(live_sources) == len(source_results):
+    st.success("✅ Tracking Server Active" if len(source_results) == 1 else f"✅ All {len(source_results)} Tracking Servers Active")
+elif server_running:
+    st.warning(f"⚠️ {len(live_sources)} of {len(source_results)} tracking servers responding")
 else:
     st.warning("⚠️ Tracking server offline")
-    
-    
 
 st.markdown("---")
 
-# Sidebar controls
-st.sidebar.header("⚙️ Configuration")
-
 st.sidebar.subheader("🎯 Badge Posting")
 badge_count = st.sidebar.slider(
     "Badges per Day",
@@ -159,64 +1640,100 @@ news_refresh = st.sidebar.selectbox(
     key="news_refresh"
 )
 
+st.sidebar.subheader("🧪 Offline Mode")
+synthetic_click_count = st.sidebar.select_slider(
+    "Synthetic Clicks",
+    options=[1_000, 10_000, 100_000, 1_000_000, 10_000_000],
+    value=100_000,
+    format_func=lambda v: f"{v:,}",
+    help="Volume of generated click data shown while the tracking server is offline"
+)
+synthetic_seed = st.sidebar.number_input("Synthetic Data Seed", min_value=0, value=42, step=1)
+
+# ============= COST MODEL =============
+daily_costs = daily_cost_model(
+    UNIT_PRICES,
+    badge_count,
+    meme_count,
+    blog_count,
+    REFRESH_DAYS[instagram_refresh],
+    REFRESH_DAYS[news_refresh],
+    "Worst" in badge_retry_scenario
+)
+
 # ============= BADGE COSTS =============
-badge_costs = {
-    "scraping": 0.00605,
-    "search": 0.00001,
-    "caption_single": 0.00189,
-    "caption_retry": 0.00945,
-    "posting": 0.00
-}
+badge_costs = {k: UNIT_PRICES[k] for k in ("scraping", "search", "caption_single", "caption_retry", "posting")}
 
 badge_caption_cost = badge_costs["caption_single"] if "Best" in badge_retry_scenario else badge_costs["caption_retry"]
-badge_cost_per_item = badge_costs["scraping"] + badge_costs["search"] + badge_caption_cost + badge_costs["posting"]
-badge_daily_cost = badge_cost_per_item * badge_count
+badge_cost_per_item = daily_costs["badge_per_item"]
+badge_daily_cost = daily_costs["badge"]
 
 # ============= MEME COSTS =============
-instagram_scraping_cost = 0.69
-instagram_embedding_cost = 0.00648
-
-refresh_days = {
-    "Daily": 1,
-    "Weekly": 7,
-    "Monthly": 30
-}
+instagram_scraping_cost = UNIT_PRICES["instagram_scraping_cost"]
+instagram_embedding_cost = UNIT_PRICES["instagram_embedding_cost"]
 
-ig_daily_scraping = instagram_scraping_cost / refresh_days[instagram_refresh]
-ig_daily_embedding = instagram_embedding_cost / refresh_days[instagram_refresh]
+ig_daily_scraping = instagram_scraping_cost / REFRESH_DAYS[instagram_refresh]
+ig_daily_embedding = instagram_embedding_cost / REFRESH_DAYS[instagram_refresh]
 
-meme_query_embedding_cost = 0.000004
-meme_text_generation_cost = 0.012
-meme_image_generation_cost = 0.039
+meme_query_embedding_cost = UNIT_PRICES["meme_query_embedding_cost"]
+meme_text_generation_cost = UNIT_PRICES["meme_text_generation_cost"]
+meme_image_generation_cost = UNIT_PRICES["meme_image_generation_cost"]
 
-meme_cost_per_item = meme_query_embedding_cost + meme_text_generation_cost + meme_image_generation_cost
+meme_cost_per_item = daily_costs["meme_per_item"]
 meme_daily_generation = meme_cost_per_item * meme_count
-meme_daily_cost = meme_daily_generation + ig_daily_scraping + ig_daily_embedding
+meme_daily_cost = daily_costs["meme"]
 
 # ============= BLOG COSTS =============
-news_scraping_cost = 1.60
-news_embedding_cost = 0.00115
+news_scraping_cost = UNIT_PRICES["news_scraping_cost"]
+news_embedding_cost = UNIT_PRICES["news_embedding_cost"]
 
-news_daily_scraping = news_scraping_cost / refresh_days[news_refresh]
-news_daily_embedding = news_embedding_cost / refresh_days[news_refresh]
+news_daily_scraping = news_scraping_cost / REFRESH_DAYS[news_refresh]
+news_daily_embedding = news_embedding_cost / REFRESH_DAYS[news_refresh]
 
-book_embedding_cost = 0.0012
-youtube_embedding_cost = 0.00096
+book_embedding_cost = UNIT_PRICES["book_embedding_cost"]
+youtube_embedding_cost = UNIT_PRICES["youtube_embedding_cost"]
 blog_source_embeddings = book_embedding_cost + youtube_embedding_cost
 
-blog_gemini_input_cost = 0.005
-blog_gemini_output_cost = 0.012
+blog_gemini_input_cost = UNIT_PRICES["blog_gemini_input_cost"]
+blog_gemini_output_cost = UNIT_PRICES["blog_gemini_output_cost"]
 blog_generation_cost = blog_gemini_input_cost + blog_gemini_output_cost
 
-blog_cost_per_item = blog_source_embeddings + blog_generation_cost
+blog_cost_per_item = daily_costs["blog_per_item"]
 blog_daily_generation = blog_cost_per_item * blog_count
-blog_daily_cost = blog_daily_generation + news_daily_scraping + news_daily_embedding
+blog_daily_cost = daily_costs["blog"]
 
 # ============= TOTALS =============
-total_daily_cost = badge_daily_cost + meme_daily_cost + blog_daily_cost
+total_daily_cost = daily_costs["total"]
 total_monthly_cost = total_daily_cost * 30
 total_monthly_posts = (badge_count + meme_count + blog_count) * 30
 
+# ============= COST LEDGER =============
+ledger = get_cost_ledger()
+today = datetime.now().date()
+
+st.sidebar.subheader("📒 Cost Ledger")
+if st.sidebar.button("📝 Record Today's Snapshot", help="Save today's configuration and costs to the local ledger"):
+    try:
+        ledger.record(today, {
+            "badge_count": badge_count,
+            "meme_count": meme_count,
+            "blog_count": blog_count,
+            "badge_retry": "Worst" in badge_retry_scenario,
+            "instagram_refresh": instagram_refresh,
+            "news_refresh": news_refresh,
+            "badge_cost": round(badge_daily_cost, 6),
+            "meme_cost": round(meme_daily_cost, 6),
+            "blog_cost": round(blog_daily_cost, 6),
+            "total_cost": round(total_daily_cost, 6),
+            "posts": badge_count + meme_count + blog_count
+        })
+        get_cost_forecaster().update(today.toordinal(), round(total_daily_cost, 6))
+        st.sidebar.success(f"✅ Recorded {today.isoformat()}")
+    except (OSError, ValueError) as e:
+        st.sidebar.error(f"❌ Could not record snapshot: {e}")
+
+month_to_date, year_to_date = ledger.period_totals(today)
+
 # ============= KEY METRICS =============
 st.markdown("### 📊 Overall Key Metrics")
 col1, col2, col3, col4 = st.columns(4)
@@ -487,7 +2004,7 @@ with tab4:
     
     # Server status check
     if not server_running:
-        st.warning("⚠️ Tracking server is offline - Showing sample data")
+        st.warning("⚠️ Tracking server is offline - Showing synthetic data")
         st.markdown("""
         <div class="error-box">
         <strong>To start the tracking server:</strong>
@@ -498,100 +2015,63 @@ with tab4:
         """, unsafe_allow_html=True)
         
         if st.button("🔄 Check Server Status"):
-            st.cache_data.clear()
+            clear_analytics_caches()
             st.rerun()
         
         st.markdown("---")
         
-        # Create sample analytics data
-        analytics = {
-            'total_clicks': 147,
-            'unique_users': 32,
-            'total_posts': 25,
-            'avg_clicks_per_post': 5.88,
-            'clicks_by_platform': {
-                'facebook': 58,
-                'linkedin': 45,
-                'twitter': 32,
-                'instagram': 12
-            },
-            'clicks_by_badge_type': {
-                'gold': 78,
-                'silver': 45,
-                'bronze': 24
-            },
-            'top_posts': [
-                {
-                    'post_url': 'https://facebook.com/posts/award-winner-2024',
-                    'platform': 'facebook',
-                    'badge_type': 'gold',
-                    'clicks': 23,
-                    'first_click': '2025-12-26T09:15:00',
-                    'last_click': '2025-12-26T18:45:00'
-                },
-                {
-                    'post_url': 'https://linkedin.com/feed/achievement-unlocked',
-                    'platform': 'linkedin',
-                    'badge_type': 'gold',
-                    'clicks': 18,
-                    'first_click': '2025-12-26T10:30:00',
-                    'last_click': '2025-12-26T17:20:00'
-                },
-                {
-                    'post_url': 'https://twitter.com/status/milestone-reached',
-                    'platform': 'twitter',
-                    'badge_type': 'silver',
-                    'clicks': 15,
-                    'first_click': '2025-12-26T11:00:00',
-                    'last_click': '2025-12-26T16:30:00'
-                },
-                {
-                    'post_url': 'https://facebook.com/posts/new-certification',
-                    'platform': 'facebook',
-                    'badge_type': 'silver',
-                    'clicks': 12,
-                    'first_click': '2025-12-26T08:45:00',
-                    'last_click': '2025-12-26T15:10:00'
-                },
-                {
-                    'post_url': 'https://instagram.com/p/recognition-day',
-                    'platform': 'instagram',
-                    'badge_type': 'bronze',
-                    'clicks': 9,
-                    'first_click': '2025-12-26T12:00:00',
-                    'last_click': '2025-12-26T14:30:00'
-                }
-            ],
-            'recent_clicks': [
-                {
-                    'timestamp': '2025-12-26T18:45:00',
-                    'platform': 'facebook',
-                    'badge_type': 'gold',
-                    'post_url': 'https://facebook.com/posts/award-winner-2024',
-                    'username': 'user_147'
-                },
-                {
-                    'timestamp': '2025-12-26T18:30:00',
-                    'platform': 'linkedin',
-                    'badge_type': 'silver',
-                    'post_url': 'https://linkedin.com/feed/team-excellence',
-                    'username': 'user_146'
-                },
-                {
-                    'timestamp': '2025-12-26T18:15:00',
-                    'platform': 'twitter',
-                    'badge_type': 'gold',
-                    'post_url': 'https://twitter.com/status/breakthrough-2024',
-                    'username': 'user_145'
-                }
-            ]
-        }
+        # Synthetic analytics at the volume chosen in the sidebar
+        analytics = synthetic_analytics(synthetic_click_count, synthetic_seed)
+        click_times, click_counts = synthetic_click_series(synthetic_click_count, synthetic_seed)
         
-        st.info("💡 This is sample data. Start the tracking server to see real analytics!")
+        # Burst screening of the synthetic set runs once per process on its own queue
+        detector, screening_job = load_synthetic_detector(synthetic_click_count, synthetic_seed)
+        screening = get_screening_queue().get(screening_job)
+        pending_screening = st.session_state.setdefault("pending_screening", [])
+        if screening and screening["status"] in ("queued", "running") and screening_job not in pending_screening:
+            pending_screening.append(screening_job)
+        
+        st.info(f"💡 This is synthetic data ({synthetic_click_count:,} clicks, seed {synthetic_seed}). Start the tracking server to see real analytics!")
+        flagged = detector.snapshot()
+        heatmaps = [detector.heatmap.snapshot()]
+        click_totals = [detector.daily_clicks]
     else:
-        analytics = fetch_analytics()
+        analytics = merge_analytics([result["analytics"] for result in live_sources])
+        if len(source_results) > 1:
+            with st.expander(f"🌐 Sources ({len(live_sources)} of {len(source_results)} responding)"):
+                st.dataframe(pd.DataFrame(get_source_health().rows(tracking_servers)), use_container_width=True, hide_index=True)
+        recent_timestamps = sorted(
+            int(datetime.fromisoformat(c['timestamp']).timestamp())
+            for c in (analytics or {}).get('recent_clicks', []) if c.get('timestamp')
+        )
+        click_times, click_counts = click_time_series(recent_timestamps)
+        
+        # One detector per source so each server's click stream is deduplicated on its own
+        snapshots = []
+        heatmaps = []
+        click_totals = []
+        for result in live_sources:
+            detector = get_live_detector(result["server"])
+            detector.ingest_records(result["analytics"].get('recent_clicks', []))
+            snapshots.append(detector.snapshot())
+            heatmaps.append(detector.heatmap.snapshot())
+            # recent_clicks is only a window, so daily totals come from the exact running counter
+            counter_days = get_click_counter_days(result["server"])
+            counter_days.observe(result["fetched_at"], result["analytics"].get('total_clicks', 0))
+            click_totals.append(counter_days)
+        flagged = merge_flagged(snapshots)
     
     if analytics:
+        # Raw numbers come from the source; filtered ones subtract detected click bursts
+        raw_analytics = analytics
+        exclude_bursts = st.toggle(
+            "🤖 Exclude suspicious click bursts",
+            value=True,
+            help="Clicks from users or posts exceeding a per-minute rate are treated as crawler bursts"
+        )
+        if exclude_bursts:
+            analytics = apply_burst_filter(raw_analytics, flagged)
+        
         # Top-level metrics
         col1, col2, col3, col4 = st.columns(4)
         
@@ -620,22 +2100,52 @@ with tab4:
         
         with col4:
             if st.button("🔄 Refresh Now"):
-                st.cache_data.clear()
+                clear_analytics_caches()
                 st.rerun()
             
-            # Reset button
-            if st.button("🗑️ Reset Analytics", type="secondary"):
-                try:
-                    response = requests.post(f"{TRACKING_SERVER}/api/reset")
-                    if response.status_code == 200:
-                        st.success("✅ Analytics reset!")
-                        time.sleep(1)
-                        st.cache_data.clear()
-                        st.rerun()
-                    else:
-                        st.error("❌ Failed to reset analytics")
-                except:
-                    st.error("❌ Could not connect to server")
+            # Reset button - runs in the background job queue so the session stays responsive
+            if st.button("🗑️ Reset Analytics", type="secondary", disabled=not server_running):
+                job_id = get_job_queue().submit("Reset analytics", reset_analytics_job, 10, tracking_servers, timeout=15)
+                st.session_state.setdefault("pending_jobs", []).append(job_id)
+            
+            for job in st.session_state.pop("finished_jobs", []):
+                show_job_result(job)
+            if st.session_state.get("pending_jobs"):
+                render_job_status()
+            for job in st.session_state.pop("finished_screening", []):
+                show_job_result(job)
+            if st.session_state.get("pending_screening"):
+                render_job_status("pending_screening", "finished_screening", get_screening_queue)
+        
+        if flagged['flagged']:
+            st.caption(
+                f"🤖 {flagged['flagged']:,} suspicious clicks from {flagged['users']:,} users "
+                f"({flagged['flagged'] / max(flagged['processed'], 1):.1%} of {flagged['processed']:,} screened) • "
+                f"Raw: {raw_analytics.get('total_clicks', 0):,} • "
+                f"Filtered: {max(0, raw_analytics.get('total_clicks', 0) - flagged['flagged']):,}"
+            )
+            if server_running:
+                st.caption(
+                    "Live screening only sees the recent clicks returned by each poll, "
+                    "so bursts outside that window are not excluded."
+                )
+            with st.expander("🔍 Raw vs Filtered Clicks"):
+                filtered_analytics = apply_burst_filter(raw_analytics, flagged)
+                comparison = [
+                    {"Group": f"📱 {k.capitalize()}", "Raw": v, "Filtered": filtered_analytics['clicks_by_platform'][k]}
+                    for k, v in (raw_analytics.get('clicks_by_platform') or {}).items()
+                ] + [
+                    {"Group": f"🏆 {k.capitalize()}", "Raw": v, "Filtered": filtered_analytics['clicks_by_badge_type'][k]}
+                    for k, v in (raw_analytics.get('clicks_by_badge_type') or {}).items()
+                ]
+                if comparison:
+                    comparison_df = pd.DataFrame(comparison)
+                    comparison_df["Excluded"] = comparison_df["Raw"] - comparison_df["Filtered"]
+                    st.dataframe(comparison_df, use_container_width=True, hide_index=True)
+                else:
+                    st.info("No platform or badge breakdown to compare")
+        elif not server_running and flagged['processed'] < synthetic_click_count:
+            st.caption(f"🤖 Screening clicks for bursts... {flagged['processed']:,} of {synthetic_click_count:,} done")
         
         st.markdown("---")
         
@@ -710,6 +2220,60 @@ with tab4:
         
         st.markdown("---")
         
+        # Clicks over time, downsampled so long ranges stay responsive
+        st.markdown("### 📈 Clicks Over Time")
+        render_time_series(click_times, click_counts, key="clicks_ts", title="Clicks per Minute", y_title="Clicks")
+        
+        st.markdown("---")
+        
+        # Engagement heatmap from the pre-binned counters, summed over sources
+        st.markdown("### 🗓️ Engagement by Hour and Weekday")
+        heat_clicks = sum(h['clicks'] for h in heatmaps)
+        if exclude_bursts:
+            heat_clicks = heat_clicks - sum(h['flagged'] for h in heatmaps)
+        
+        platform_labels = [p.capitalize() for p in PLATFORMS] + ["Other"]
+        badge_labels = [b.capitalize() for b in BADGE_TYPES] + ["Other"]
+        filter_left, filter_right = st.columns(2)
+        with filter_left:
+            heat_platforms = st.multiselect("Platforms", platform_labels, default=platform_labels, key="heatmap_platforms")
+        with filter_right:
+            heat_badges = st.multiselect("Badge Types", badge_labels, default=badge_labels, key="heatmap_badges")
+        
+        grid = heat_clicks[
+            np.ix_([platform_labels.index(p) for p in heat_platforms], [badge_labels.index(b) for b in heat_badges])
+        ].sum(axis=(0, 1)) if heat_platforms and heat_badges else np.zeros((7, 24), dtype=np.int64)
+        
+        if grid.sum():
+            fig_heatmap = go.Figure(data=go.Heatmap(
+                z=grid,
+                x=[f"{hour:02d}:00" for hour in range(24)],
+                y=WEEKDAY_NAMES,
+                colorscale='Purples',
+                hovertemplate='%{y} %{x}<br>%{z:,} clicks<extra></extra>'
+            ))
+            fig_heatmap.update_layout(
+                height=350,
+                paper_bgcolor='rgba(0,0,0,0)',
+                plot_bgcolor='rgba(0,0,0,0)',
+                yaxis=dict(autorange='reversed'),
+                xaxis_title="Hour of Day"
+            )
+            st.plotly_chart(fig_heatmap, use_container_width=True)
+            
+            best = np.argsort(grid, axis=None)[::-1][:3]
+            st.caption("🕐 Best posting slots: " + " • ".join(
+                f"{WEEKDAY_NAMES[cell // 24]} {cell % 24:02d}:00 ({grid.flat[cell]:,} clicks)" for cell in best if grid.flat[cell]
+            ))
+            if server_running:
+                st.caption("Built from clicks seen since the dashboard started watching the tracking servers.")
+        elif not server_running and flagged['processed'] < synthetic_click_count:
+            st.info("🗓️ Heatmap fills in as the synthetic clicks are screened...")
+        else:
+            st.info("🗓️ No clicks for the selected platforms and badge types yet")
+        
+        st.markdown("---")
+        
         # Top Performing Posts
         st.markdown("### 🌟 Top Performing Posts")
         
@@ -826,7 +2390,7 @@ with tab4:
     else:
         st.warning("⚠️ Could not fetch analytics data. The server might be busy.")
         if st.button("🔄 Try Again"):
-            st.cache_data.clear()
+            clear_analytics_caches()
             st.rerun()
 
 st.markdown("---")
@@ -860,6 +2424,107 @@ fig_bar.update_layout(
 
 st.plotly_chart(fig_bar, use_container_width=True)
 
+# Recorded actuals per month (from the ledger rollups) against the current configuration's projection
+ledger_months = ledger.monthly_totals()
+if ledger_months:
+    st.markdown("#### 📅 Actuals vs Projection")
+    months = pd.period_range(min(ledger_months), pd.Period(today, freq="M") + 11, freq="M")
+    current_month = pd.Period(today, freq="M")
+    actual_costs, projected_costs = [], []
+    for month in months:
+        actual_costs.append(ledger_months.get(str(month), {}).get("cost"))
+        if month < current_month:
+            projected_costs.append(None)
+        elif month == current_month:
+            # Project every day after the last recorded one, including today if it isn't recorded yet
+            last_recorded = ledger.last_recorded()
+            recorded_through = last_recorded.day if last_recorded and pd.Period(last_recorded, freq="M") == month else 0
+            remaining_days = month.days_in_month - recorded_through
+            projected_costs.append(month_to_date["cost"] + remaining_days * total_daily_cost)
+        else:
+            projected_costs.append(month.days_in_month * total_daily_cost)
+
+    fig_actuals = go.Figure()
+    fig_actuals.add_trace(go.Bar(
+        x=months.astype(str), y=actual_costs, name="Recorded", marker_color='#667eea'
+    ))
+    fig_actuals.add_trace(go.Scatter(
+        x=months.astype(str), y=projected_costs, name="Projected", mode='lines+markers',
+        line=dict(color='#f093fb', dash='dash')
+    ))
+    fig_actuals.update_layout(
+        height=400,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        yaxis_title="Monthly Cost ($)"
+    )
+    st.plotly_chart(fig_actuals, use_container_width=True)
+else:
+    st.caption("📒 Record daily snapshots from the sidebar to compare actual spend with this projection.")
+
+st.markdown("---")
+
+# ============= FORECASTS =============
+# Online Holt-Winters estimators: updated as days are recorded or clicks arrive, never refit here
+st.markdown("### 🔮 Forecasts")
+forecast_days = st.radio("Horizon", [7, 30], format_func=lambda d: f"Next {d} days", horizontal=True, key="forecast_horizon")
+col_cost, col_clicks = st.columns(2)
+
+with col_cost:
+    st.markdown("#### 💰 Daily Cost")
+    cost_forecaster = get_cost_forecaster()
+    cost_start = today.toordinal() if cost_forecaster.last_day is None else max(today.toordinal(), cost_forecaster.last_day + 1)
+    cost_forecast = cost_forecaster.forecast(cost_start, forecast_days)
+    if cost_forecast:
+        cost_mean, cost_lower, cost_upper = forecast_bands([cost_forecast])
+        cost_gap = cost_mean.sum() - total_daily_cost * forecast_days
+        st.metric(
+            label=f"Next {forecast_days} Days",
+            value=f"${cost_mean.sum():.2f}",
+            delta=f"{'+' if cost_gap >= 0 else '-'}${abs(cost_gap):.2f} vs current config",
+            delta_color="inverse"
+        )
+        if cost_forecaster.level is None:
+            st.caption(f"Warming up: flat average of {len(cost_forecaster.history)} recorded day(s) until a full week is recorded")
+        else:
+            st.caption(f"Range ${cost_lower.sum():.2f} – ${cost_upper.sum():.2f} from {len(cost_forecaster.history)} recorded days")
+        st.plotly_chart(
+            forecast_figure(cost_forecaster.recent(), cost_start, cost_mean, cost_lower, cost_upper, "Daily Cost ($)"),
+            use_container_width=True
+        )
+    else:
+        st.metric(label=f"Next {forecast_days} Days", value=f"${total_daily_cost * forecast_days:.2f}", delta="current config")
+        st.caption("📒 Record daily snapshots from the sidebar to forecast from actual spend.")
+
+with col_clicks:
+    st.markdown("#### 🖱️ Daily Clicks")
+    closed_days = [t.forecaster.last_day for t in click_totals if t.forecaster.last_day is not None]
+    click_forecasts = []
+    if closed_days:
+        click_start = max(closed_days) + 1
+        click_forecasts = [f for f in (t.forecaster.forecast(click_start, forecast_days) for t in click_totals) if f]
+    if click_forecasts:
+        click_mean, click_lower, click_upper = forecast_bands(click_forecasts)
+        click_history = {}
+        for t in click_totals:
+            for day, count in t.forecaster.recent():
+                click_history[day] = click_history.get(day, 0) + count
+        st.metric(
+            label=f"Next {forecast_days} Days",
+            value=f"{click_mean.sum():,.0f}",
+            delta=f"{sum(t.clicks_so_far(click_start) for t in click_totals):,} so far today" if click_start == today.toordinal() else None
+        )
+        st.caption(
+            f"Range {click_lower.sum():,.0f} – {click_upper.sum():,.0f} • "
+            + ("from each server's total click counter" if server_running else "suspicious bursts excluded")
+        )
+        st.plotly_chart(
+            forecast_figure(sorted(click_history.items()), click_start, click_mean, click_lower, click_upper, "Clicks", '#4facfe'),
+            use_container_width=True
+        )
+    else:
+        st.info("🖱️ Click forecasts start once a full day of clicks has been seen, from one midnight to the next")
+
 # ============= KEY INSIGHTS =============
 st.markdown("### 💡 Key Insights")
 
@@ -884,6 +2549,155 @@ with col2:
     - Badge retries can increase costs by {((badge_costs['caption_retry'] - badge_costs['caption_single']) / badge_costs['caption_single'] * 100):.0f}%
     """)
 
+# ============= BUDGET OPTIMIZER =============
+with st.expander("🧮 Budget Optimizer"):
+    st.markdown("Find the volumes and refresh cadences that get the most out of a monthly budget.")
+
+    col_a, col_b = st.columns(2)
+
+    with col_a:
+        monthly_budget = st.number_input(
+            "Monthly Budget ($)",
+            min_value=1.0,
+            value=float(round(total_monthly_cost)),
+            step=10.0
+        )
+        objective = st.radio(
+            "Optimize For",
+            ["posts", "cpc"],
+            format_func=lambda o: {"posts": "📮 Most posts", "cpc": "🖱️ Lowest cost per click"}[o],
+            horizontal=True
+        )
+        allowed_cadences = st.multiselect(
+            "Allowed Refresh Cadences",
+            list(REFRESH_DAYS),
+            default=list(REFRESH_DAYS)
+        )
+
+    with col_b:
+        badge_bounds = st.slider("Badges per Day (min, max)", 1, 1000, (1, 1000))
+        meme_bounds = st.slider("Memes per Day (min, max)", 1, 500, (1, 500))
+        blog_bounds = st.slider("Blogs per Day (min, max)", 1, 100, (1, 100))
+
+    default_ctr = float((analytics or {}).get('avg_clicks_per_post') or 1.0)
+    st.markdown("**Expected clicks per post** (used for cost per click)")
+    col_c1, col_c2, col_c3 = st.columns(3)
+    with col_c1:
+        badge_ctr = st.number_input("Badge", min_value=0.0, value=default_ctr, step=0.1, key="ctr_badges")
+    with col_c2:
+        meme_ctr = st.number_input("Meme", min_value=0.0, value=1.0, step=0.1, key="ctr_memes")
+    with col_c3:
+        blog_ctr = st.number_input("Blog", min_value=0.0, value=1.0, step=0.1, key="ctr_blogs")
+
+    if not allowed_cadences:
+        st.warning("Select at least one refresh cadence")
+    else:
+        solve_start = time.perf_counter()
+        plan = optimize_plan(
+            UNIT_PRICES,
+            monthly_budget,
+            {"badges": badge_bounds, "memes": meme_bounds, "blogs": blog_bounds},
+            "Worst" in badge_retry_scenario,
+            objective=objective,
+            clicks_per_post={"badges": badge_ctr, "memes": meme_ctr, "blogs": blog_ctr},
+            cadences=allowed_cadences
+        )
+        solve_ms = (time.perf_counter() - solve_start) * 1000
+
+        if plan is None:
+            st.error(f"❌ No plan within ${monthly_budget:,.2f}/month meets the minimum volumes")
+        else:
+            col_r1, col_r2, col_r3, col_r4 = st.columns(4)
+            with col_r1:
+                st.metric("Monthly Cost", f"${plan['monthly_cost']:.2f}",
+                          delta=f"${plan['monthly_cost'] - total_monthly_cost:+.2f} vs current", delta_color="inverse")
+            with col_r2:
+                st.metric("Posts/Month", f"{plan['monthly_posts']:,}",
+                          delta=f"{plan['monthly_posts'] - total_monthly_posts:+,} vs current")
+            with col_r3:
+                cpc = plan.get('cost_per_click')
+                st.metric("Cost per 1K Clicks", f"${cpc * 1000:.2f}" if cpc else "N/A")
+            with col_r4:
+                st.metric("Plans Searched", f"{plan['plans_evaluated']:,}", delta=f"{plan['plans_feasible']:,} within budget")
+
+            plan_df = pd.DataFrame({
+                "Setting": ["🎯 Badges/Day", "🎨 Memes/Day", "📰 Blogs/Day", "📸 Instagram Refresh", "📰 News Refresh"],
+                "Current": [f"{badge_count:,}", f"{meme_count:,}", f"{blog_count:,}", instagram_refresh, news_refresh],
+                "Optimized": [f"{plan['badges']:,}", f"{plan['memes']:,}", f"{plan['blogs']:,}", plan['instagram_refresh'], plan['news_refresh']]
+            })
+            st.dataframe(plan_df, use_container_width=True, hide_index=True)
+            if plan['objective'] != objective:
+                st.caption("ℹ️ No plan earns any clicks at these click rates, so the plan with the most posts is shown")
+            st.caption(f"Solved in {solve_ms:.0f} ms")
+
+# ============= PRICE SENSITIVITY =============
+with st.expander("🌪️ Price Sensitivity"):
+    st.markdown("Which unit price assumption moves the monthly bill most, at the current configuration.")
+
+    col_a, col_b = st.columns(2)
+    with col_a:
+        swing_pct = st.slider("Price Change (±%)", min_value=1, max_value=100, value=20)
+    with col_b:
+        n_steps = st.slider("Perturbation Steps", min_value=3, max_value=501, value=201, step=2)
+
+    sens_start = time.perf_counter()
+    steps = np.linspace(-swing_pct / 100, swing_pct / 100, n_steps)
+    price_names, sens_costs = price_sensitivity(
+        UNIT_PRICES,
+        steps,
+        badges=badge_count,
+        memes=meme_count,
+        blogs=blog_count,
+        ig_refresh_days=REFRESH_DAYS[instagram_refresh],
+        news_refresh_days=REFRESH_DAYS[news_refresh],
+        badge_retry="Worst" in badge_retry_scenario
+    )
+    sens_ms = (time.perf_counter() - sens_start) * 1000
+
+    sens_df = pd.DataFrame({
+        "Price": price_names,
+        "Low": sens_costs[:, 0] - total_monthly_cost,
+        "High": sens_costs[:, -1] - total_monthly_cost
+    })
+    sens_df["Swing"] = (sens_df["High"] - sens_df["Low"]).abs()
+    sens_df = sens_df[sens_df["Swing"] > 0].sort_values("Swing")
+
+    fig_tornado = go.Figure()
+    fig_tornado.add_trace(go.Bar(
+        y=sens_df["Price"], x=sens_df["Low"], orientation='h',
+        name=f"-{swing_pct}%", marker_color='#43e97b'
+    ))
+    fig_tornado.add_trace(go.Bar(
+        y=sens_df["Price"], x=sens_df["High"], orientation='h',
+        name=f"+{swing_pct}%", marker_color='#f5576c'
+    ))
+    fig_tornado.update_layout(
+        barmode='overlay',
+        height=max(300, 28 * len(sens_df)),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        xaxis_title="Change in Monthly Cost ($)",
+        yaxis_title=""
+    )
+    st.plotly_chart(fig_tornado, use_container_width=True)
+
+    # Cost response over the whole range for the most influential prices
+    top_names = list(sens_df["Price"])[::-1][:5]
+    fig_response = go.Figure()
+    for name in top_names:
+        fig_response.add_trace(go.Scatter(
+            x=steps * 100, y=sens_costs[price_names.index(name)], mode='lines', name=name
+        ))
+    fig_response.update_layout(
+        height=350,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        xaxis_title="Price Change (%)",
+        yaxis_title="Monthly Cost ($)"
+    )
+    st.plotly_chart(fig_response, use_container_width=True)
+    st.caption(f"{len(price_names)} prices × {n_steps} steps evaluated in {sens_ms:.1f} ms")
+
 # ============= DETAILED STATS =============
 with st.expander("📊 View Detailed Statistics"):
     st.markdown("#### Volume & Cost Matrix")
@@ -901,6 +2715,102 @@ with st.expander("📊 View Detailed Statistics"):
     with col_c:
         st.metric("Yearly Projection", f"${total_monthly_cost * 12:.2f}")
         st.metric("Cost per 1K posts", f"${(total_daily_cost / (badge_count + meme_count + blog_count) * 1000):.2f}")
+    
+    st.markdown("#### Recorded Actuals")
+    
+    col_d, col_e, col_f = st.columns(3)
+    
+    with col_d:
+        st.metric("Month-to-Date", f"${month_to_date['cost']:.2f}", delta=f"{month_to_date['days']} days recorded")
+    
+    with col_e:
+        st.metric("Year-to-Date", f"${year_to_date['cost']:.2f}", delta=f"{year_to_date['days']} days recorded")
+    
+    with col_f:
+        st.metric("Posts Year-to-Date", f"{year_to_date['posts']:,}")
+
+# ============= REPORT EXPORT =============
+st.markdown("### 📤 Export Report")
+
+col_fmt, col_events, col_go = st.columns([2, 2, 1])
+with col_fmt:
+    export_format = st.selectbox("Format", list(EXPORT_FORMATS))
+with col_events:
+    include_events = st.checkbox(
+        "Include raw click events",
+        value=not server_running,
+        disabled=server_running or export_format == "HTML",
+        help="Synthetic click events, streamed in chunks (CSV and Parquet only)"
+    )
+
+cost_periods = pd.DataFrame({
+    "Category": ["Badges", "Memes", "Blogs", "Total"],
+    "Daily": [badge_daily_cost, meme_daily_cost, blog_daily_cost, total_daily_cost]
+})
+for period, days in (("Weekly", 7), ("Monthly", 30), ("Yearly", 360)):
+    cost_periods[period] = cost_periods["Daily"] * days
+
+report_tables = {
+    "Cost per Period": cost_periods.round(4),
+    "Badge Cost Breakdown": pd.DataFrame(badge_breakdown),
+    "Badge Scaling": badge_scaling,
+    "Meme Infrastructure Costs": pd.DataFrame(infra_breakdown),
+    "Meme Generation Costs": pd.DataFrame(meme_gen_breakdown),
+    "Meme Scaling": meme_scaling,
+    "Blog Infrastructure Costs": pd.DataFrame(blog_infra_breakdown),
+    "Blog Generation Costs": pd.DataFrame(blog_gen_breakdown),
+    "Blog Scaling": blog_scaling
+}
+if analytics:
+    filtered_analytics = apply_burst_filter(raw_analytics, flagged)
+    report_tables["Click Summary"] = pd.DataFrame({
+        "Metric": ["Total Clicks", "Unique Users", "Posts Tracked", "Avg Clicks/Post"],
+        "Raw": [raw_analytics.get(k, 0) for k in ('total_clicks', 'unique_users', 'total_posts', 'avg_clicks_per_post')],
+        "Filtered": [filtered_analytics.get(k, 0) for k in ('total_clicks', 'unique_users', 'total_posts', 'avg_clicks_per_post')]
+    })
+    for title, key in (("Clicks by Platform", 'clicks_by_platform'), ("Clicks by Badge Type", 'clicks_by_badge_type')):
+        report_tables[title] = pd.DataFrame({
+            "Group": list(raw_analytics.get(key) or {}),
+            "Raw": list((raw_analytics.get(key) or {}).values()),
+            "Filtered": list((filtered_analytics.get(key) or {}).values())
+        })
+    report_tables["Top Posts"] = pd.DataFrame(filtered_analytics.get('top_posts') or [])
+    report_tables["Recent Clicks"] = pd.DataFrame(raw_analytics.get('recent_clicks') or [])
+report_tables = {title: table for title, table in report_tables.items() if not table.empty}
+
+with col_go:
+    st.write("")
+    if st.button("📤 Start Export"):
+        export_events = load_synthetic_clicks(synthetic_click_count, synthetic_seed) if include_events and export_format != "HTML" else None
+        export_path = EXPORT_DIR / f"cost-report-{datetime.now():%Y%m%d-%H%M%S}.{EXPORT_FORMATS[export_format]}"
+        job_id = get_export_queue().submit(
+            f"{export_format} export", export_report_job, report_tables, export_events, export_format, export_path, timeout=600
+        )
+        st.session_state.setdefault("report_exports", {})[job_id] = export_path
+        st.session_state.setdefault("pending_exports", []).append(job_id)
+
+for job in st.session_state.pop("finished_exports", []):
+    show_job_result(job)
+if st.session_state.get("pending_exports"):
+    render_job_status("pending_exports", "finished_exports", get_export_queue)
+
+report_exports = st.session_state.get("report_exports", {})
+completed_exports = [
+    job_id for job_id, path in report_exports.items()
+    if (get_export_queue().get(job_id) or {}).get("status") == "done" and path.exists()
+]
+# Only the newest export is offered for download, so older files are deleted
+for job_id in completed_exports[:-1]:
+    report_exports.pop(job_id).unlink(missing_ok=True)
+completed_exports = [report_exports[job_id] for job_id in completed_exports[-1:]]
+if completed_exports:
+    latest_export = completed_exports[-1]
+    # Deferred so the file is only read when the button is clicked, not on every rerun
+    st.download_button(
+        f"⬇️ Download {latest_export.name}",
+        data=lambda path=latest_export: path.read_bytes(),
+        file_name=latest_export.name
+    )
 
 # Footer
 st.markdown("---")